@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Vektorisierte Personal-Zuteilung (Python-Version von needMA, blockKey,
+proportionalAssign und rebuildPools aus index.html).
+
+Alle Pools und alle Szenarien werden gemeinsam als Arrays (Szenarien x Pools)
+gerechnet, damit hunderte Besetzungs-Varianten in einem Aufruf auswertbar sind.
+Die Ergebnisse entsprechen exakt der Berechnung im Browser.
+"""
+import numpy as np
+
+EARLY_END = 15.5  # 15:30 ist die Grenze zwischen FRÜH und SPÄT
+BLOCKS = ('morning', 'midday', 'late')
+
+# Täti ist im Live-Modus für Morning und Midday verfügbar
+DEFAULT_TAETI_BLOCKS = {'morning': True, 'midday': True, 'late': False}
+
+
+def to_hours(hm):
+    """'07:30' -> 7.5 (wie toHours im Frontend)"""
+    if not hm:
+        return 0.0
+    parts = str(hm).split(':')
+    try:
+        h = float(parts[0]) if parts[0] else 0.0
+        m = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
+    except ValueError:
+        return 0.0
+    return h + m / 60
+
+
+def hours_between(start, deadline):
+    if not start or not deadline:
+        return 0.01
+    return max(0.01, to_hours(deadline) - to_hours(start))
+
+
+def block_key(start, deadline):
+    """'morning' (nur FRÜH), 'midday' (FRÜH+SPÄT) oder 'late' (nur SPÄT)"""
+    if to_hours(deadline) <= EARLY_END:
+        return 'morning'
+    if to_hours(start) >= EARLY_END:
+        return 'late'
+    return 'midday'
+
+
+def _uses_taeti(pool):
+    return bool(pool.get('useTäti', pool.get('useRotation', False)))
+
+
+class PoolSet:
+    """Statische Pool-Daten als Arrays, sortiert nach Deadline (wie rebuildPools)"""
+
+    def __init__(self, pools):
+        def minutes(time):
+            return to_hours(time) * 60
+
+        pools = sorted(pools, key=lambda p: minutes(p.get('deadline')))
+        self.pools = pools
+        self.names = [p.get('name') for p in pools]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.blocks = [block_key(p.get('start'), p.get('deadline')) for p in pools]
+
+        block_idx = np.array([BLOCKS.index(b) for b in self.blocks], dtype=np.int64)
+        self.use_taeti = np.array([_uses_taeti(p) for p in pools], dtype=bool)
+        # Gruppe 0..5: (Block, mit Täti) -> block*2, (Block, ohne Täti) -> block*2+1
+        self.group = block_idx * 2 + (~self.use_taeti).astype(np.int64)
+
+        self.hours = np.array([hours_between(p.get('start'), p.get('deadline')) for p in pools], dtype=float)
+        self.rate = np.array([float(p.get('rate') or 80) for p in pools], dtype=float)
+        self.factor = np.array([float(1 if p.get('factor') is None else p.get('factor')) for p in pools], dtype=float)
+        self.live_vol = np.array([float(p.get('liveVol') or 0) for p in pools], dtype=float)
+        self.fix_vol = np.array([float(p.get('fixVol') or 0) for p in pools], dtype=float)
+
+    def __len__(self):
+        return len(self.pools)
+
+    def per_pool(self, value, base):
+        """Szenario-Wert (Zahl oder {Poolname: Zahl}) -> Array über alle Pools"""
+        if value is None:
+            return base
+        if isinstance(value, dict):
+            out = base.copy()
+            for name, v in value.items():
+                i = self.index.get(name)
+                if i is not None:
+                    out[i] = float(v)
+            return out
+        return np.full(len(self), float(value))
+
+
+def need_ma(volume, factor, rate, hours):
+    """Benötigte Mitarbeiter: ceil(vol * faktor / (rate * stunden)), elementweise"""
+    return np.ceil(volume * factor / (rate * hours))
+
+
+def proportional_assign(needs, group, caps):
+    """
+    Largest-Remainder-Verteilung der Kapazität je Gruppe auf die Pools.
+
+    needs: (S, P) Bedarf, group: (P,) Gruppe je Pool, caps: (S, G) Kapazität je Gruppe.
+    Gleiche Reste werden (wie im Browser) in Pool-Reihenfolge bedient.
+    """
+    S, P = needs.shape
+    assign = np.zeros((S, P), dtype=float)
+    rows = np.arange(S)[:, None]
+
+    for g in range(caps.shape[1]):
+        cols = np.flatnonzero(group == g)
+        if cols.size == 0:
+            continue
+        n = needs[:, cols]
+        total = n.sum(axis=1)
+        cap = caps[:, g]
+        valid = (total > 0) & (cap > 0)
+        safe_total = np.where(valid, total, 1.0)
+
+        raw = cap[:, None] * (n / safe_total[:, None])
+        floor = np.floor(raw)
+        remain = cap - floor.sum(axis=1)
+
+        order = np.argsort(-(raw - floor), axis=1, kind='stable')
+        rank = np.empty_like(order)
+        rank[rows, order] = np.arange(cols.size)
+
+        result = floor + (rank < remain[:, None])
+        assign[:, cols] = np.where(valid[:, None], result, 0.0)
+
+    return assign
+
+
+def evaluate(pools, scenarios, detail=True):
+    """
+    Wertet alle Szenarien in einem Durchlauf aus.
+
+    Szenario-Felder (alle optional):
+    - maFrueh, maSpat, maTäti: Anzahl Mitarbeiter
+    - basis: 'live' (Standard) oder 'fix'
+    - taetiBlocks: {'morning': bool, 'midday': bool, 'late': bool}
+    - rate, factor: Zahl für alle Pools oder {Poolname: Zahl}
+    - volumes: {Poolname: Volumen} überschreibt das Volumen der Basis
+    """
+    pool_set = pools if isinstance(pools, PoolSet) else PoolSet(pools)
+    S, P = len(scenarios), len(pool_set)
+
+    rate = np.empty((S, P))
+    factor = np.empty((S, P))
+    volume = np.empty((S, P))
+    caps = np.zeros((S, 2 * len(BLOCKS)))
+
+    for s, sc in enumerate(scenarios):
+        rate[s] = pool_set.per_pool(sc.get('rate'), pool_set.rate)
+        factor[s] = pool_set.per_pool(sc.get('factor'), pool_set.factor)
+        base_vol = pool_set.fix_vol if sc.get('basis') == 'fix' else pool_set.live_vol
+        volume[s] = pool_set.per_pool(sc.get('volumes'), base_vol)
+
+        frueh = float(sc.get('maFrueh') or 0)
+        spaet = float(sc.get('maSpat') or 0)
+        taeti = float(sc.get('maTäti') or 0)
+        blocks_on = {**DEFAULT_TAETI_BLOCKS, **(sc.get('taetiBlocks') or {})}
+
+        base_caps = {'morning': frueh, 'midday': frueh + spaet, 'late': spaet}
+        for b, block in enumerate(BLOCKS):
+            caps[s, b * 2] = base_caps[block] + (taeti if blocks_on[block] else 0)
+            caps[s, b * 2 + 1] = base_caps[block]
+
+    rate = np.where(rate > 0, rate, 80.0)
+    need = need_ma(volume, factor, rate, pool_set.hours[None, :])
+    assigned = proportional_assign(need, pool_set.group, caps)
+    delta = assigned - need
+
+    results = []
+    for s in range(S):
+        total_need = int(need[s].sum())
+        total_assigned = int(assigned[s].sum())
+        result = {
+            "totals": {
+                "need": total_need,
+                "assigned": total_assigned,
+                "delta": total_assigned - total_need,
+                "shortPools": int((delta[s] < 0).sum()),
+                "engpassPools": int((delta[s] <= -3).sum()),
+            }
+        }
+        if detail:
+            result["pools"] = [
+                {
+                    "name": pool_set.names[i],
+                    "block": pool_set.blocks[i],
+                    "need": int(need[s, i]),
+                    "assigned": int(assigned[s, i]),
+                    "delta": int(delta[s, i]),
+                    "status": status(delta[s, i]),
+                }
+                for i in range(P)
+            ]
+        results.append(result)
+    return results
+
+
+def status(delta):
+    """Gleiche Einstufung wie badge_pool im Frontend"""
+    if delta >= 0:
+        return "ok"
+    if delta > -3:
+        return "kritisch"
+    return "engpass"
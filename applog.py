@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Strukturiertes, gestuftes Logging statt print().
+
+- LOG_LEVEL:       DEBUG, INFO (Standard), WARNING, ERROR
+- LOG_FORMAT:      text (Meldung + key=value) oder json (eine Zeile pro Eintrag)
+- LOG_SAMPLE_RATE: Anteil der Hot-Path-Meldungen (sample=True), die geschrieben werden,
+                   z.B. 0.01 in Produktion; Warnungen und Fehler werden nie gesampelt
+
+Request-Threads schreiben nicht selbst auf stdout: Einträge gehen in eine Queue,
+ein eigener Thread pro Prozess (auch nach fork()) gibt sie aus.
+
+    log = get_logger(__name__)
+    log.info("✅ Pools geladen", count=18, source="db", sample=True)
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value if value and not any(c in value for c in ' ="') else json.dumps(value, ensure_ascii=False)
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text: '<zeit> <LEVEL> <logger> <meldung> key=value ...' oder eine JSON-Zeile"""
+
+    def __init__(self, fmt="text"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        timestamp = datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        exc = self.formatException(record.exc_info) if record.exc_info else None
+
+        if self.fmt == "json":
+            entry = {"ts": timestamp, "level": record.levelname, "logger": record.name,
+                     "msg": record.getMessage(), **fields}
+            if exc:
+                entry["exc"] = exc
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{k}={_format_value(v)}" for k, v in fields.items())
+        if exc:
+            line += "\n" + exc
+        return line
+
+
+class _AsyncHandler(logging.handlers.QueueHandler):
+    """QueueHandler mit eigenem Ausgabe-Thread pro Prozess"""
+
+    def __init__(self, stream):
+        super().__init__(queue.SimpleQueue())
+        self._output = logging.StreamHandler(stream)
+        self._output.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().enqueue(record)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Nach fork(): Ausgabe-Thread des Elternprozesses existiert hier nicht
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self._output)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush_pending)
+
+    def flush_pending(self):
+        """Gibt alle noch wartenden Einträge aus (beim Beenden)"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_logging():
+    """Root-Logger einmalig konfigurieren (Level, Format, asynchrone Ausgabe)"""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = _AsyncHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        _configured = True
+
+
+class StructuredLogger:
+    """Dünne Hülle um logging.Logger mit key=value-Feldern und optionalem Sampling"""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, msg, sample, exc_info, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample and LOG_SAMPLE_RATE < 1 and random.random() >= LOG_SAMPLE_RATE:
+            return
+        self._logger.log(level, msg, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, msg, sample=False, **fields):
+        self._log(logging.DEBUG, msg, sample, None, fields)
+
+    def info(self, msg, sample=False, **fields):
+        self._log(logging.INFO, msg, sample, None, fields)
+
+    def warning(self, msg, **fields):
+        self._log(logging.WARNING, msg, False, None, fields)
+
+    def error(self, msg, **fields):
+        self._log(logging.ERROR, msg, False, None, fields)
+
+    def exception(self, msg, **fields):
+        """ERROR mit Traceback (nur innerhalb eines except-Blocks aufrufen)"""
+        self._log(logging.ERROR, msg, False, True, fields)
+
+    def is_enabled(self, level):
+        return self._logger.isEnabledFor(getattr(logging, level.upper()))
+
+
+def get_logger(name):
+    configure_logging()
+    return StructuredLogger(name)
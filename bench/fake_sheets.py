@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Lokaler Ersatz für den CSV-Export von Google Sheets (nur für Benchmarks).
+
+Liefert unter /spreadsheets/d/<id>/export?format=csv&gid=<gid> generierte Sheets:
+- Live-Vol:        POOL,LIVE-VOL (Werte ändern sich bei jedem Abruf)
+- Pool-Konfiguration: NAME,START,DEADLINE,FAKTOR,RATE,ROTATION
+- Mitarbeiter:     Dienstplan mit einer Datumsspalte pro Tag eines ganzen Jahres
+
+Fehlerbilder sind einstellbar: Latenz, 429-Quote, 400 für bestimmte Sheets.
+
+Start:  python3 bench/fake_sheets.py --port 8765 --latency 0.2 --rate-429 0.1
+"""
+import argparse
+import datetime
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LIVE_VOL_SHEET_ID = "bench-livevol"
+POOL_CONFIG_SHEET_ID = "bench-pools"
+MITARBEITER_SHEET_ID = "bench-mitarbeiter"
+
+SHIFT_CODES = ["FRÜH", "FRÜH", "FRÜH", "SPÄT", "SPÄT", "Täti", "U", "K", "FT", "-", ""]
+DEADLINES = ["08:45", "10:00", "11:00", "13:00", "15:00", "16:00", "16:30", "17:00", "18:00"]
+
+
+def pool_names(count):
+    return [f"Pool {i + 1:03d}" for i in range(count)]
+
+
+def build_pool_config_csv(pools):
+    lines = ["NAME,START,DEADLINE,FAKTOR,RATE,ROTATION"]
+    for i, name in enumerate(pool_names(pools)):
+        rotation = "JA" if i % 4 == 0 else "NEIN"
+        lines.append(f"{name},06:00,{DEADLINES[i % len(DEADLINES)]},{1 + (i % 3) * 0.5},80,{rotation}")
+    return "\n".join(lines) + "\n"
+
+
+def build_livevol_csv(pools, rng):
+    lines = ["POOL,LIVE-VOL"]
+    for name in pool_names(pools):
+        lines.append(f"{name},{rng.randint(0, 5000)}")
+    return "\n".join(lines) + "\n"
+
+
+def build_roster_csv(employees, year, rng):
+    """Dienstplan wie im echten Mitarbeiter-Sheet: Datumszeile in Zeile 4, ab Zeile 5 Mitarbeiter"""
+    start = datetime.date(year, 1, 1)
+    days = [start + datetime.timedelta(days=i) for i in range((datetime.date(year + 1, 1, 1) - start).days)]
+    weekdays = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+    rows = [
+        [""] * (len(days) + 1),
+        [""] + [f"{d.isocalendar()[1]} / {year}" for d in days],
+        [""] + [weekdays[d.weekday()] for d in days],
+        [""] + [d.strftime("%d.%m.") for d in days],
+    ]
+    for e in range(employees):
+        rows.append([f"Mitarbeiter {e + 1:04d}"] + [rng.choice(SHIFT_CODES) for _ in days])
+    return "\n".join(",".join(row) for row in rows) + "\n"
+
+
+class FakeSheets:
+    """Konfiguration und generierte Inhalte des Fake-Servers"""
+
+    def __init__(self, pools=18, employees=300, year=None, latency=0.0, rate_429=0.0,
+                 bad_sheets=(), seed=42):
+        self.pools = pools
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.bad_sheets = set(bad_sheets)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+        year = year or datetime.date.today().year
+        self.pool_config_csv = build_pool_config_csv(pools)
+        self.roster_csv = build_roster_csv(employees, year, self.rng)
+
+    def render(self, sheet_id):
+        """(status, body) für einen Export-Request"""
+        with self.lock:
+            self.requests += 1
+            throttle = self.rng.random() < self.rate_429
+            livevol = build_livevol_csv(self.pools, self.rng) if sheet_id == LIVE_VOL_SHEET_ID else None
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if sheet_id in self.bad_sheets:
+            return 400, "Bad Request"
+        if throttle:
+            return 429, "Too Many Requests"
+        if sheet_id == LIVE_VOL_SHEET_ID:
+            return 200, livevol
+        if sheet_id == POOL_CONFIG_SHEET_ID:
+            return 200, self.pool_config_csv
+        if sheet_id == MITARBEITER_SHEET_ID:
+            return 200, self.roster_csv
+        return 404, "Not Found"
+
+
+def make_handler(sheets):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            parts = parsed.path.strip('/').split('/')
+            query = parse_qs(parsed.query)
+            if len(parts) != 4 or parts[:2] != ["spreadsheets", "d"] or parts[3] != "export" \
+                    or query.get("format") != ["csv"]:
+                status, body = 404, "Not Found"
+            else:
+                status, body = sheets.render(parts[2])
+
+            if status != 200:
+                with sheets.lock:
+                    sheets.errors += 1
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "text/csv; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(sheets, host="127.0.0.1", port=0):
+    """Startet den Fake-Server in einem Thread; liefert (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(sheets))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-sheets", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Sheets CSV-Export für Benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pools", type=int, default=18)
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="Sekunden Verzögerung pro Antwort")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Anteil der Antworten mit 429")
+    parser.add_argument("--bad-sheet", action="append", default=[], help="Sheet-ID, die mit 400 antwortet")
+    args = parser.parse_args()
+
+    sheets = FakeSheets(args.pools, args.employees, latency=args.latency,
+                        rate_429=args.rate_429, bad_sheets=args.bad_sheet)
+    server, base_url = start_server(sheets, args.host, args.port)
+    print(f"🧪 Fake Google Sheets läuft auf {base_url}")
+    print(f"   LIVE_VOL_SHEET_ID={LIVE_VOL_SHEET_ID} POOL_CONFIG_SHEET_ID={POOL_CONFIG_SHEET_ID} "
+          f"MITARBEITER_SHEET_ID={MITARBEITER_SHEET_ID}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Reproduzierbarer Lasttest für server.py.
+
+Ablauf:
+1. Fake Google Sheets (bench/fake_sheets.py) starten - optional langsam, mit 429/400
+2. Postgres bereitstellen: --database-url / BENCH_DATABASE_URL, sonst ein temporärer
+   Cluster über initdb/pg_ctl (falls installiert), sonst ohne Datenbank
+3. Tabellen mit Pools und einem Jahr Mitarbeiter-Daten befüllen (bench/seed.py)
+4. Die App als eigenen Prozess starten (gunicorn gthread wie in Produktion, sonst Flask)
+5. Den Polling-Mix des Frontends mit N parallelen Clients für X Sekunden abspielen
+6. Durchsatz und p50/p95/p99 pro Route ausgeben, optional als JSON speichern
+   und mit einem früheren Lauf vergleichen (--compare)
+
+Beispiele:
+    python3 bench/run_bench.py --concurrency 32 --duration 30 --output bench/results/main.json
+    python3 bench/run_bench.py --sheet-latency 2 --sheet-429 0.2 --compare bench/results/main.json
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from fake_sheets import (
+    LIVE_VOL_SHEET_ID,
+    MITARBEITER_SHEET_ID,
+    POOL_CONFIG_SHEET_ID,
+    FakeSheets,
+    start_server,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Standard-Mix entspricht grob dem Frontend: viel Lesen, wenig Speichern
+DEFAULT_MIX = "pools=45,mitarbeiter=45,mitarbeiter_save=8,pools_save=2"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank-Perzentil einer sortierten Liste"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class TempPostgres:
+    """Temporärer Postgres-Cluster (initdb + pg_ctl) für einen Lauf"""
+
+    def __init__(self):
+        self.dir = None
+        self.port = None
+        self.bindir = self._find_bindir()
+
+    @staticmethod
+    def _find_bindir():
+        if shutil.which("initdb") and shutil.which("pg_ctl"):
+            return os.path.dirname(shutil.which("initdb"))
+        pg_config = shutil.which("pg_config")
+        if pg_config:
+            bindir = subprocess.check_output([pg_config, "--bindir"], text=True).strip()
+            if os.path.exists(os.path.join(bindir, "initdb")):
+                return bindir
+        return None
+
+    @property
+    def available(self):
+        return self.bindir is not None
+
+    def start(self):
+        self.dir = tempfile.mkdtemp(prefix="bench-pg-")
+        self.port = free_port()
+        data = os.path.join(self.dir, "data")
+        subprocess.run([os.path.join(self.bindir, "initdb"), "-D", data, "-U", "bench", "-A", "trust"],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([os.path.join(self.bindir, "pg_ctl"), "-D", data, "-l", os.path.join(self.dir, "log"),
+                        "-o", f"-p {self.port} -k {self.dir} -c listen_addresses=127.0.0.1", "-w", "start"],
+                       check=True, stdout=subprocess.DEVNULL)
+        return f"postgresql://bench@127.0.0.1:{self.port}/postgres"
+
+    def stop(self):
+        if self.dir is None:
+            return
+        subprocess.run([os.path.join(self.bindir, "pg_ctl"), "-D", os.path.join(self.dir, "data"),
+                        "-m", "fast", "stop"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.dir = None
+
+
+def start_app(args, port, database_url, sheets_url):
+    """Startet server.py als eigenen Prozess und wartet, bis er antwortet"""
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "GOOGLE_SHEETS_BASE_URL": sheets_url,
+        "LIVE_VOL_SHEET_ID": LIVE_VOL_SHEET_ID,
+        "POOL_CONFIG_SHEET_ID": POOL_CONFIG_SHEET_ID,
+        "MITARBEITER_SHEET_ID": MITARBEITER_SHEET_ID,
+    })
+    env.pop("DATABASE_URL", None)
+    if database_url:
+        env["DATABASE_URL"] = database_url
+
+    server = args.server
+    if server == "auto":
+        server = "gunicorn" if shutil.which("gunicorn") else "flask"
+    if server == "gunicorn":
+        cmd = ["gunicorn", "server:app", f"--bind=127.0.0.1:{port}", f"--workers={args.workers}",
+               "--worker-class=gthread", f"--threads={args.threads}", "--log-level=warning"]
+    else:
+        cmd = [sys.executable, "-c",
+               f"from server import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    log = open(os.path.join(tempfile.gettempdir(), f"bench-app-{port}.log"), "w")
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"App beendet (Exit {proc.returncode}), siehe {log.name}")
+        try:
+            if requests.get(f"{base_url}/api/config/sheets", timeout=1).ok:
+                return proc, base_url, server, log.name
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"App antwortet nicht, siehe {log.name}")
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unbekannte Operation(en): {', '.join(sorted(unknown))}")
+    return mix
+
+
+# Operationen: (session, base_url, ctx, rng) -> (route, status_code)
+
+def op_pools(session, base_url, ctx, rng):
+    r = session.get(f"{base_url}/api/pools", timeout=30)
+    return "GET /api/pools", r.status_code
+
+
+def op_mitarbeiter(session, base_url, ctx, rng):
+    date = ctx["dates"][rng.randrange(len(ctx["dates"]))]
+    r = session.get(f"{base_url}/api/mitarbeiter/{date}", timeout=30)
+    return "GET /api/mitarbeiter/<date>", r.status_code
+
+
+def op_dashboard(session, base_url, ctx, rng):
+    date = ctx["dates"][rng.randrange(len(ctx["dates"]))]
+    r = session.get(f"{base_url}/api/dashboard", params={"date": date}, timeout=30)
+    return "GET /api/dashboard", r.status_code
+
+
+def op_mitarbeiter_save(session, base_url, ctx, rng):
+    date = ctx["dates"][rng.randrange(len(ctx["dates"]))]
+    r = session.post(f"{base_url}/api/mitarbeiter/save", json={
+        "date": date, "maFrueh": rng.randint(20, 60), "maSpat": rng.randint(10, 40), "maTäti": rng.randint(0, 10)
+    }, timeout=30)
+    return "POST /api/mitarbeiter/save", r.status_code
+
+
+def op_pools_save(session, base_url, ctx, rng):
+    # Wie das Frontend: komplette Liste zurückschreiben, ein Pool mit geändertem Faktor
+    pools = [dict(p) for p in ctx["pools"]]
+    if pools:
+        pools[rng.randrange(len(pools))]["factor"] = rng.choice([1, 1.5, 2])
+    r = session.post(f"{base_url}/api/pools/save", json=pools, timeout=30)
+    return "POST /api/pools/save", r.status_code
+
+
+OPERATIONS = {
+    "pools": op_pools,
+    "mitarbeiter": op_mitarbeiter,
+    "mitarbeiter_save": op_mitarbeiter_save,
+    "pools_save": op_pools_save,
+    "dashboard": op_dashboard,
+}
+
+
+def run_load(base_url, mix, concurrency, duration, warmup, ctx, seed):
+    """Spielt den Mix ab; liefert {route: [(latenz_s, status), ...]} und die Messdauer"""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = {}
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        local = []
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            op = OPERATIONS[rng.choices(names, weights)[0]]
+            t0 = time.perf_counter()
+            try:
+                route, status = op(session, base_url, ctx, rng)
+            except requests.RequestException:
+                route, status = op.__name__, 0
+            elapsed = time.perf_counter() - t0
+            if now >= measure_from:
+                local.append((route, elapsed, status))
+        with lock:
+            for route, elapsed, status in local:
+                samples.setdefault(route, []).append((elapsed, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, duration
+
+
+def summarize(samples, duration):
+    routes = {}
+    all_latencies = []
+    total_errors = 0
+    for route, values in sorted(samples.items()):
+        latencies = sorted(v[0] for v in values)
+        errors = sum(1 for v in values if not 200 <= v[1] < 400)
+        total_errors += errors
+        all_latencies.extend(latencies)
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors,
+            "rps": round(len(values) / duration, 1),
+            "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+            "maxMs": round(latencies[-1] * 1000, 2),
+        }
+    all_latencies.sort()
+    total = {
+        "requests": len(all_latencies),
+        "errors": total_errors,
+        "rps": round(len(all_latencies) / duration, 1),
+        "p50Ms": round(percentile(all_latencies, 50) * 1000, 2) if all_latencies else None,
+        "p95Ms": round(percentile(all_latencies, 95) * 1000, 2) if all_latencies else None,
+        "p99Ms": round(percentile(all_latencies, 99) * 1000, 2) if all_latencies else None,
+    }
+    return routes, total
+
+
+def print_table(routes, total):
+    header = f"{'Route':<30} {'Anfragen':>9} {'Fehler':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, r in list(routes.items()) + [("GESAMT", total)]:
+        print(f"{route:<30} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8} "
+              f"{r['p50Ms']!s:>9} {r['p95Ms']!s:>9} {r['p99Ms']!s:>9}")
+
+
+def print_comparison(result, baseline):
+    """Veränderung gegenüber einem früheren Lauf (positiv = besser)"""
+    print(f"\n📊 Vergleich mit {baseline.get('revision') or 'Baseline'} ({baseline.get('startedAt')})")
+    base_routes = dict(baseline["routes"], GESAMT=baseline["total"])
+    for route, r in list(result["routes"].items()) + [("GESAMT", result["total"])]:
+        b = base_routes.get(route)
+        if not b:
+            continue
+        parts = []
+        for key, higher_is_better in (("rps", True), ("p50Ms", False), ("p95Ms", False), ("p99Ms", False)):
+            if not b.get(key) or r.get(key) is None:
+                continue
+            change = (r[key] - b[key]) / b[key] * 100
+            if not higher_is_better:
+                change = -change
+            parts.append(f"{key} {b[key]} → {r[key]} ({change:+.1f}%)")
+        print(f"  {route:<30} " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für server.py mit Fake-Sheets und Postgres")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallele Clients")
+    parser.add_argument("--duration", type=float, default=20, help="Messdauer in Sekunden")
+    parser.add_argument("--warmup", type=float, default=3, help="Aufwärmphase (nicht gemessen)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Gewichteter Mix (Standard: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="Bestehende Test-Datenbank (wird geleert!), sonst temporärer Cluster")
+    parser.add_argument("--no-db", action="store_true", help="Ohne Datenbank (nur Sheet-Fallbacks)")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "flask"], default="auto")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--pools", type=int, default=18)
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--sheet-latency", type=float, default=0.0, help="Verzögerung der Fake-Sheets (s)")
+    parser.add_argument("--sheet-429", type=float, default=0.0, help="Anteil 429-Antworten der Fake-Sheets")
+    parser.add_argument("--sheet-400", action="append", default=[], choices=["livevol", "pools", "mitarbeiter"],
+                        help="Sheet antwortet immer mit 400 (mehrfach möglich)")
+    parser.add_argument("--output", help="Ergebnis als JSON speichern")
+    parser.add_argument("--compare", help="Mit einem früheren JSON-Ergebnis vergleichen")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    bad_sheets = {"livevol": LIVE_VOL_SHEET_ID, "pools": POOL_CONFIG_SHEET_ID, "mitarbeiter": MITARBEITER_SHEET_ID}
+    year = datetime.date.today().year
+
+    sheets = FakeSheets(args.pools, args.employees, year=year, latency=args.sheet_latency,
+                        rate_429=args.sheet_429, bad_sheets=[bad_sheets[s] for s in args.sheet_400])
+    sheets_server, sheets_url = start_server(sheets)
+    print(f"🧪 Fake Google Sheets: {sheets_url}")
+
+    temp_pg = None
+    database_url = None
+    if not args.no_db:
+        database_url = args.database_url
+        if not database_url:
+            temp_pg = TempPostgres()
+            if temp_pg.available:
+                database_url = temp_pg.start()
+                print(f"🐘 Temporärer Postgres-Cluster auf Port {temp_pg.port}")
+            else:
+                temp_pg = None
+                print("⚠️ Kein Postgres gefunden (--database-url / initdb) - Lauf ohne Datenbank")
+
+    proc = None
+    try:
+        if database_url:
+            from seed import seed
+            pools, days = seed(database_url, args.pools, year, args.seed)
+            print(f"🌱 {pools} Pools und {days} Mitarbeiter-Tage angelegt")
+
+        proc, base_url, server, log_path = start_app(args, free_port(), database_url, sheets_url)
+        print(f"🚀 App ({server}) auf {base_url}, Log: {log_path}")
+
+        start = datetime.date(year, 1, 1)
+        ctx = {
+            "dates": [(start + datetime.timedelta(days=i)).isoformat() for i in range(365)],
+            "pools": requests.get(f"{base_url}/api/pools", timeout=30).json(),
+        }
+
+        print(f"⏱️  {args.concurrency} Clients, {args.warmup:g}s Aufwärmen + {args.duration:g}s Messung, Mix: {args.mix}")
+        started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        samples, duration = run_load(base_url, mix, args.concurrency, args.duration, args.warmup, ctx, args.seed)
+        routes, total = summarize(samples, duration)
+
+        try:
+            app_stats = requests.get(f"{base_url}/api/stats", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            app_stats = None
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        sheets_server.shutdown()
+        if temp_pg is not None:
+            temp_pg.stop()
+
+    print()
+    print_table(routes, total)
+
+    result = {
+        "revision": git_revision(),
+        "startedAt": started_at,
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": mix,
+            "server": server,
+            "workers": args.workers if server == "gunicorn" else 1,
+            "threads": args.threads if server == "gunicorn" else None,
+            "database": bool(database_url),
+            "pools": args.pools,
+            "employees": args.employees,
+            "sheetLatency": args.sheet_latency,
+            "sheet429": args.sheet_429,
+            "sheet400": args.sheet_400,
+        },
+        "routes": routes,
+        "total": total,
+        "upstream": {"requests": sheets.requests, "errors": sheets.errors},
+        "appStats": app_stats,
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Ergebnis gespeichert: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(result, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
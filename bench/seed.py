@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Legt die Tabellen für Benchmarks an (Migrationen aus schema.py) und befüllt sie mit Testdaten:
+- pools:       N Pools (gleiche Namen wie im Fake-Sheet)
+- mitarbeiter: ein Eintrag pro Tag für ein ganzes Jahr
+
+Start:  python3 bench/seed.py --database-url postgresql://localhost/bench --pools 18
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from fake_sheets import DEADLINES, pool_names
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schema import migrate
+
+
+def seed(database_url, pools=18, year=None, seed_value=42):
+    """Setzt beide Tabellen zurück und befüllt sie; liefert (anzahl_pools, anzahl_tage)"""
+    rng = random.Random(seed_value)
+    year = year or datetime.date.today().year
+    start = datetime.date(year, 1, 1)
+    days = (datetime.date(year + 1, 1, 1) - start).days
+
+    pool_rows = [
+        (name, "06:00", DEADLINES[i % len(DEADLINES)], 1 + (i % 3) * 0.5, 80, i % 4 == 0)
+        for i, name in enumerate(pool_names(pools))
+    ]
+    mitarbeiter_rows = [
+        (start + datetime.timedelta(days=i), rng.randint(20, 60), rng.randint(10, 40), rng.randint(0, 10))
+        for i in range(days)
+    ]
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                migrate(cur)
+                cur.execute("TRUNCATE pools, mitarbeiter RESTART IDENTITY")
+                execute_values(cur, """
+                    INSERT INTO pools (name, start_time, deadline, factor, rate, use_rotation)
+                    VALUES %s
+                """, pool_rows, page_size=len(pool_rows) or 1)
+                execute_values(cur, """
+                    INSERT INTO mitarbeiter (date, frueh, spat, taeti)
+                    VALUES %s
+                """, mitarbeiter_rows, page_size=1000)
+    finally:
+        conn.close()
+    return len(pool_rows), len(mitarbeiter_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Testdaten für Benchmarks anlegen")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--pools", type=int, default=18)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url oder BENCH_DATABASE_URL erforderlich")
+
+    pools, days = seed(args.database_url, args.pools, args.year)
+    print(f"✅ {pools} Pools und {days} Mitarbeiter-Tage angelegt")
+
+
+if __name__ == '__main__':
+    main()
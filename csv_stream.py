@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Streaming-Parse von CSV-Exporten direkt aus der HTTP-Antwort.
+
+Statt den ganzen Export als String (response.text) und als Zeilenmatrix
+(list(csv.reader(...))) im Speicher zu halten, wird der Body in Blöcken
+gelesen und Zeile für Zeile an einen Parser übergeben. Nebenbei wird der
+SHA1 der gelesenen Bytes berechnet (Änderungserkennung im Refresher).
+
+Der Parser bekommt einen Zeilen-Iterator und darf jederzeit aufhören zu
+lesen (z.B. nach dem Ende der Datenzeilen) - der Rest wird nicht geladen.
+"""
+import csv
+import hashlib
+import io
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_CHARSET = re.compile(r'charset=([\w.:-]+)', re.IGNORECASE)
+
+
+class HashingReader(io.RawIOBase):
+    """Liest einen Byte-Stream (z.B. response.raw) und berechnet dabei den SHA1"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._pending = b''
+        self.sha1 = hashlib.sha1()
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._pending or self._raw.read(len(buffer))
+        # Dekomprimierende Streams können mehr liefern als angefragt
+        chunk, self._pending = data[:len(buffer)], data[len(buffer):]
+        n = len(chunk)
+        buffer[:n] = chunk
+        self.sha1.update(chunk)
+        self.bytes_read += n
+        return n
+
+
+def response_encoding(response, default='utf-8'):
+    """Zeichensatz aus dem Content-Type, sonst UTF-8 (Google liefert UTF-8)"""
+    match = _CHARSET.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else default
+
+
+def parse_csv_response(response, parse_rows):
+    """
+    Parst eine mit stream=True geöffnete requests-Antwort zeilenweise.
+
+    parse_rows(rows) bekommt einen Iterator über CSV-Zeilen (Listen von Strings)
+    und liefert den geparsten Wert. Ergebnis: (wert, sha1_hex der gelesenen Bytes).
+    """
+    response.raw.decode_content = True  # gzip/deflate wie bei response.text
+    reader = HashingReader(response.raw)
+    text = io.TextIOWrapper(io.BufferedReader(reader, CHUNK_SIZE),
+                            encoding=response_encoding(response), errors='replace', newline='')
+    value = parse_rows(csv.reader(text))
+    return value, reader.sha1.hexdigest()
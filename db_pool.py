@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL Connection-Pool pro Prozess (gunicorn-Worker).
+
+- min/max Verbindungen pro Worker
+- Health-Check (SELECT 1) für Verbindungen, die länger ungenutzt waren
+- Fork-sicher: nach einem fork() werden geerbte Verbindungen verworfen
+  (nicht geschlossen, sonst würde die Verbindung des Elternprozesses beendet)
+- Wartet bis acquire_timeout, wenn alle Verbindungen belegt sind
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """Keine freie Verbindung innerhalb von acquire_timeout"""
+
+
+class ConnectionPool:
+    def __init__(self, dsn, minconn=1, maxconn=5, ping_after=30.0, acquire_timeout=10.0):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = max(maxconn, minconn, 1)
+        self.ping_after = ping_after
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        self._reset_state()
+
+        # Zähler über die Lebenszeit des Prozesses
+        self.created = 0
+        self.discarded = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = deque()   # (conn, last_used)
+        self._size = 0         # offene Verbindungen (idle + in Benutzung)
+        self._in_use = 0
+        self._waiting = 0
+
+    def _check_fork(self):
+        """Nach fork(): geerbte Verbindungen gehören dem Elternprozess"""
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._reset_state()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self.ping_failures += 1
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def _prefill(self):
+        """Füllt den Pool bis minconn auf (beim ersten Zugriff im Worker)"""
+        while True:
+            with self._cond:
+                if self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Holt eine (geprüfte) Verbindung aus dem Pool"""
+        self._check_fork()
+        if self._size < self.minconn:
+            self._prefill()
+
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"Keine freie DB-Verbindung nach {self.acquire_timeout}s")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+                self._in_use += 1
+
+            if create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(conn, last_used):
+                return conn
+            with self._cond:
+                self._in_use -= 1
+            self._discard(conn)
+
+    def release(self, conn):
+        """Gibt eine Verbindung zurück (kaputte oder geerbte werden verworfen)"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            self._in_use -= 1
+        if conn.closed or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Schließt alle freien Verbindungen dieses Prozesses"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """Pool-Zustand als Dict (für /api/stats)"""
+        with self._cond:
+            return {
+                "pid": self._pid,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "size": self._size,
+                "idle": len(self._idle),
+                "inUse": self._in_use,
+                "waiting": self._waiting,
+                "created": self.created,
+                "discarded": self.discarded,
+                "pingFailures": self.ping_failures,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+HTTP-Caching und Kompression.
+
+- API (GET, JSON): Content-Hash-ETag + 304 bei If-None-Match, Cache-Control: no-cache
+- Statische Dateien: Inhalt, Hash und komprimierte Varianten (br/gzip) werden
+  einmal pro Datei-Version im Speicher vorberechnet; mit ?v=<hash> sind sie
+  ein Jahr cachebar (immutable), sonst wird per ETag revalidiert
+- Antworten werden je nach Accept-Encoding mit brotli oder gzip komprimiert
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: ohne brotli nur gzip
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding():
+    """Beste vom Client akzeptierte Kodierung: 'br', 'gzip' oder None"""
+    offered = ['br', 'gzip'] if brotli else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _weaken(etag):
+    """Komprimierte Varianten bekommen ein schwaches ETag (If-None-Match vergleicht schwach)"""
+    if etag and not etag.startswith('W/'):
+        return f'W/{etag}'
+    return etag
+
+
+def finalize_response(response):
+    """after_request: Validatoren für API-Antworten und Kompression"""
+    if response.direct_passthrough or response.is_streamed:
+        return response
+
+    if (request.method in ('GET', 'HEAD') and response.status_code == 200
+            and response.mimetype == 'application/json'):
+        if 'ETag' not in response.headers:
+            response.add_etag()
+        response.headers.setdefault('Cache-Control', 'no-cache')
+        response.make_conditional(request)
+
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = _weaken(response.headers['ETag'])
+    return response
+
+
+class PrecompressedBody:
+    """Fester Antwort-Body mit (lazy) komprimierten Varianten, einmal pro Version berechnet"""
+
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding):
+        """Komprimierter Inhalt (einmal pro Version berechnet)"""
+        with self._lock:
+            if encoding not in self._variants:
+                self._variants[encoding] = compress(self.data, encoding)
+            return self._variants[encoding]
+
+    def response(self, etag, cache_control='no-cache'):
+        """Antwort mit passender Kodierung; 304 bei passendem If-None-Match"""
+        encoding = None
+        if is_compressible(self.mimetype) and len(self.data) >= COMPRESS_MIN_SIZE:
+            encoding = negotiate_encoding()
+
+        response = Response(self.variant(encoding) if encoding else self.data, mimetype=self.mimetype)
+        response.headers['ETag'] = _weaken(etag) if encoding else etag
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response.make_conditional(request)
+
+
+class _StaticFile(PrecompressedBody):
+    """Eine Datei-Version mit Hash und (lazy) komprimierten Varianten"""
+
+    def __init__(self, path, stat):
+        with open(path, 'rb') as f:
+            data = f.read()
+        super().__init__(data, mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.digest = hashlib.sha1(self.data).hexdigest()[:16]
+
+
+class StaticFiles:
+    """Statische Auslieferung mit Content-Hash-ETags und vorkomprimierten Varianten"""
+
+    def __init__(self, root, max_cached_size=5 * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.max_cached_size = max_cached_size
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path):
+        full_path = safe_join(self.root, path)
+        if full_path is None or not os.path.isfile(full_path):
+            return None
+        stat = os.stat(full_path)
+        if stat.st_size > self.max_cached_size:
+            return None
+        with self._lock:
+            cached = self._files.get(full_path)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+        loaded = _StaticFile(full_path, stat)
+        with self._lock:
+            self._files[full_path] = loaded
+        return loaded
+
+    def version(self, path):
+        """Content-Hash einer Datei (für ?v=...), None wenn nicht vorhanden"""
+        static_file = self._load(path)
+        return static_file.digest if static_file else None
+
+    def response(self, path, immutable_if_versioned=True):
+        """
+        Antwort für eine statische Datei.
+        None, wenn die Datei zu groß ist (dann normale Auslieferung per send_from_directory).
+        """
+        full_path = safe_join(self.root, path)
+        if full_path is None or not os.path.isfile(full_path):
+            abort(404)
+
+        static_file = self._load(path)
+        if static_file is None:
+            return None
+
+        etag = f'"{static_file.digest}"'
+        if immutable_if_versioned and request.args.get('v') == static_file.digest:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = 'no-cache'
+
+        return static_file.response(etag, cache_control)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Zeitreihen-Speicher für Live-Vol in PostgreSQL.
+
+Layout (Tabellen in schema.py, Migration 3):
+- livevol_series:    Pool-Name -> kleine ID (smallint)
+- livevol_snapshots: EINE Zeile pro Messzeitpunkt, alle Pools als Arrays
+                     (series_ids smallint[], vols int[]) statt einer Zeile pro Pool
+- livevol_buckets:   vorab aggregierte Buckets (1 min, 15 min, 1 h) pro Pool mit
+                     Anzahl, Summe, Min, Max und letztem Wert
+
+Jeder gunicorn-Worker nimmt im selben Takt auf; der Zeitstempel wird auf das
+Intervall gerundet, sodass nur der erste Worker pro Intervall schreibt
+(ON CONFLICT DO NOTHING) und die Buckets genau einmal fortgeschrieben werden.
+
+Ältere Daten werden ausgedünnt: Rohdaten und feine Buckets werden nach ihrer
+Aufbewahrungszeit gelöscht, die gröberen Buckets bleiben länger erhalten.
+Abfragen (/api/livevol/history) lesen nur Buckets, nie Rohdaten.
+"""
+import datetime
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from applog import get_logger
+from schema import migrate
+
+log = get_logger(__name__)
+
+# Auflösung in Sekunden -> Aufbewahrung in Tagen
+RESOLUTIONS = (60, 900, 3600)
+RETENTION_DAYS = {
+    "raw": 2,
+    60: 14,
+    900: 180,
+    3600: 1825,
+}
+
+PRUNE_LOCK_ID = 74530003
+
+# Snapshot + alle Bucket-Auflösungen in einem Statement; Buckets nur, wenn der Snapshot neu ist
+RECORD_SQL = """
+WITH snap AS (
+    INSERT INTO livevol_snapshots (ts, series_ids, vols)
+    VALUES (%(ts)s, %(series_ids)s::smallint[], %(vols)s::integer[])
+    ON CONFLICT (ts) DO NOTHING
+    RETURNING ts, series_ids, vols
+), points AS (
+    SELECT snap.ts, p.series_id, p.vol
+    FROM snap, unnest(snap.series_ids, snap.vols) AS p(series_id, vol)
+)
+INSERT INTO livevol_buckets AS b (resolution, series_id, bucket_start, n, vsum, vmin, vmax, vlast, last_ts)
+SELECT r.res, points.series_id,
+       to_timestamp(floor(extract(epoch FROM points.ts) / r.res) * r.res),
+       1, points.vol, points.vol, points.vol, points.vol, points.ts
+FROM points CROSS JOIN unnest(%(resolutions)s::integer[]) AS r(res)
+ON CONFLICT (resolution, series_id, bucket_start) DO UPDATE SET
+    n = b.n + 1,
+    vsum = b.vsum + EXCLUDED.vsum,
+    vmin = LEAST(b.vmin, EXCLUDED.vmin),
+    vmax = GREATEST(b.vmax, EXCLUDED.vmax),
+    vlast = CASE WHEN EXCLUDED.last_ts >= b.last_ts THEN EXCLUDED.vlast ELSE b.vlast END,
+    last_ts = GREATEST(b.last_ts, EXCLUDED.last_ts)
+"""
+
+
+def round_timestamp(ts, seconds):
+    """Rundet einen Unix-Zeitstempel auf ein Vielfaches von seconds ab (als UTC-datetime)"""
+    rounded = int(ts // seconds * seconds)
+    return datetime.datetime.fromtimestamp(rounded, datetime.timezone.utc)
+
+
+def pick_resolution(start, end, max_points):
+    """Feinste Auflösung mit höchstens max_points Buckets, deren Daten noch aufbewahrt werden"""
+    span = (end - start).total_seconds()
+    age_days = (datetime.datetime.now(datetime.timezone.utc) - start).total_seconds() / 86400
+    for resolution in RESOLUTIONS:
+        if span / resolution <= max_points and age_days <= RETENTION_DAYS[resolution]:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+class LivevolStore:
+    def __init__(self, get_connection, source, sample_seconds=10.0, max_age=None, prune_every=3600.0):
+        # get_connection(operation) -> Context-Manager mit DB-Verbindung (commit beim Verlassen)
+        # source() -> (volumes_dict oder None, alter_in_sekunden oder None)
+        self._get_connection = get_connection
+        self._source = source
+        self.sample_seconds = sample_seconds
+        self.max_age = max_age if max_age is not None else sample_seconds
+        self.prune_every = prune_every
+        self._series_ids = {}
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._last_prune = 0.0
+
+        self.recorded = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_error = None
+
+    # ---------- Schema / Serien ----------
+
+    @contextmanager
+    def _cursor(self, operation):
+        """Cursor in einer Transaktion; führt beim ersten Mal pro Prozess offene Migrationen aus"""
+        with self._get_connection(operation) as conn:
+            with conn.cursor() as cur:
+                if not self._schema_ready:
+                    migrate(cur)
+                yield cur
+        self._schema_ready = True  # erst nach dem Commit
+
+    def _resolve_series(self, cur, names):
+        """Pool-Namen -> (IDs, neu gelesene Zuordnungen); neue Namen werden angelegt"""
+        known = self._series_ids
+        missing = [n for n in names if n not in known]
+        fetched = {}
+        if missing:
+            # Erst lesen, dann nur wirklich neue Namen einfügen: ON CONFLICT verbraucht sonst
+            # bei jedem Worker-Start Sequenzwerte (smallint)
+            cur.execute("SELECT id, name FROM livevol_series WHERE name = ANY(%s)", (missing,))
+            fetched = {name: series_id for series_id, name in cur.fetchall()}
+            new_names = [n for n in missing if n not in fetched]
+            if new_names:
+                cur.execute("""
+                    INSERT INTO livevol_series (name)
+                    SELECT unnest(%s::text[])
+                    ON CONFLICT (name) DO NOTHING
+                """, (new_names,))
+                cur.execute("SELECT id, name FROM livevol_series WHERE name = ANY(%s)", (new_names,))
+                fetched.update({name: series_id for series_id, name in cur.fetchall()})
+        return [known.get(n) or fetched[n] for n in names], fetched
+
+    # ---------- Aufnahme ----------
+
+    def ensure_running(self):
+        """Startet den Aufnahme-Thread (einmal pro Prozess, auch nach fork())"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = None
+                self._series_ids = {}
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="livevol-recorder", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Auf die nächste Intervallgrenze warten (alle Worker nehmen denselben Zeitstempel)
+            now = time.time()
+            time.sleep(self.sample_seconds - now % self.sample_seconds + 0.05)
+            volumes, age = self._source()
+            if not volumes or age is None or age > self.max_age:
+                self.skipped += 1
+                continue
+            try:
+                self.record(volumes)
+                if time.monotonic() - self._last_prune >= self.prune_every:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                log.warning("⚠️ Live-Vol Aufnahme fehlgeschlagen", error=str(e))
+
+    def record(self, volumes, ts=None):
+        """Speichert einen Snapshot {pool: menge}; True, wenn dieser Worker ihn geschrieben hat"""
+        ts = round_timestamp(time.time() if ts is None else ts, self.sample_seconds)
+        names = sorted(volumes)
+        with self._cursor("livevol_record") as cur:
+            series_ids, fetched = self._resolve_series(cur, names)
+            cur.execute(RECORD_SQL, {
+                "ts": ts,
+                "series_ids": series_ids,
+                "vols": [int(volumes[n]) for n in names],
+                "resolutions": list(RESOLUTIONS),
+            })
+            written = cur.rowcount > 0
+        # IDs erst nach dem Commit übernehmen (bei Rollback gäbe es sie nicht)
+        self._series_ids = {**self._series_ids, **fetched}
+        if written:
+            self.recorded += 1
+        return written
+
+    def prune(self):
+        """Löscht Rohdaten und Buckets nach ihrer Aufbewahrungszeit (nur ein Worker gleichzeitig)"""
+        with self._cursor("livevol_prune") as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (PRUNE_LOCK_ID,))
+            if not cur.fetchone()[0]:
+                return 0
+            cur.execute("DELETE FROM livevol_snapshots WHERE ts < now() - make_interval(days => %s)",
+                        (RETENTION_DAYS["raw"],))
+            deleted = cur.rowcount
+            for resolution in RESOLUTIONS:
+                cur.execute("""
+                    DELETE FROM livevol_buckets
+                    WHERE resolution = %s AND bucket_start < now() - make_interval(days => %s)
+                """, (resolution, RETENTION_DAYS[resolution]))
+                deleted += cur.rowcount
+        if deleted:
+            log.info("🧹 Alte Live-Vol Daten gelöscht", rows=deleted)
+        return deleted
+
+    # ---------- Abfrage ----------
+
+    def history(self, start, end, resolution, pools=None):
+        """
+        Buckets im Bereich [start, end) als Spalten pro Pool:
+        {pool: {"t": [...], "avg": [...], "min": [...], "max": [...], "last": [...]}}
+        """
+        with self._cursor("livevol_history") as cur:
+            cur.execute("""
+                SELECT s.name, b.bucket_start, b.vsum::float8 / b.n, b.vmin, b.vmax, b.vlast
+                FROM livevol_buckets b
+                JOIN livevol_series s ON s.id = b.series_id
+                WHERE b.resolution = %s
+                  AND b.bucket_start >= %s AND b.bucket_start < %s
+                  AND (%s::text[] IS NULL OR s.name = ANY(%s::text[]))
+                ORDER BY s.name, b.bucket_start
+            """, (resolution, start, end, pools, pools))
+            rows = cur.fetchall()
+
+        series = {}
+        for name, bucket_start, avg, vmin, vmax, vlast in rows:
+            entry = series.get(name)
+            if entry is None:
+                entry = series[name] = {"t": [], "avg": [], "min": [], "max": [], "last": []}
+            entry["t"].append(bucket_start.isoformat())
+            entry["avg"].append(round(avg, 1))
+            entry["min"].append(vmin)
+            entry["max"].append(vmax)
+            entry["last"].append(vlast)
+        return series
+
+    def stats(self):
+        return {
+            "sampleSeconds": self.sample_seconds,
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "lastError": self.last_error,
+            "series": len(self._series_ids),
+        }
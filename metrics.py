@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Minimale Metrik-Registry im Prometheus-Textformat (für GET /metrics).
+
+- Counter, Histogram: werden im Hot Path nur unter einem Lock hochgezählt
+- Callback-Metriken: Werte werden erst beim Abruf von /metrics ausgelesen
+  (z.B. Zähler von SheetRefresher und ConnectionPool), kosten also im Request nichts
+
+Werte gelten pro Prozess (pro gunicorn-Worker); jede Zeile trägt deshalb das Label pid.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name}: erwartet Labels {self.labels}")
+        return tuple(str(v) for v in label_values)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self, extra):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k, extra)} {_format_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket_counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        key = self._key(label_values)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def collect(self, extra):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += entry[i]
+                labels = _format_labels(self.labels, key, tuple(extra) + (("le", _format_number(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key, tuple(extra) + (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key, extra)} {_format_number(entry[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key, extra)} {entry[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge oder Counter, dessen Werte beim Abruf über callback() -> {label_tuple: wert} gelesen werden"""
+
+    def __init__(self, name, help_text, labels, callback, kind="gauge"):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self._callback = callback
+
+    def collect(self, extra):
+        values = self._callback() or {}
+        lines = []
+        for key, value in values.items():
+            if value is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labels, key, extra)} {_format_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik {metric.name} existiert bereits")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def gauge_callback(self, name, help_text, labels, callback):
+        return self._register(CallbackMetric(name, help_text, labels, callback, "gauge"))
+
+    def counter_callback(self, name, help_text, labels, callback):
+        return self._register(CallbackMetric(name, help_text, labels, callback, "counter"))
+
+    def render(self):
+        """Alle Metriken im Prometheus-Textformat (version 0.0.4)"""
+        extra = (("pid", os.getpid()),)
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.collect(extra)
+            except Exception:
+                continue  # eine kaputte Callback-Metrik darf /metrics nicht verhindern
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
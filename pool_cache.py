@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Pool-Konfiguration als Snapshot im Speicher jedes Workers.
+
+- Der Snapshot enthält die Pools, das ETag und den fertig serialisierten
+  (und bei Bedarf komprimierten) JSON-Body: GET /api/pools kostet keinen DB-Zugriff
+- Invalidierung über PostgreSQL LISTEN/NOTIFY: save_pools sendet in seiner
+  Transaktion NOTIFY, alle Worker (auch auf anderen Instanzen) verwerfen ihren
+  Snapshot, sobald die Änderung committed ist
+- Jeder Worker hält dafür eine eigene Verbindung (nicht aus dem Pool) mit LISTEN
+- Ist diese Verbindung getrennt, wird der Cache umgangen (direkt aus der DB),
+  damit nie eine verpasste Benachrichtigung zu veralteten Daten führt
+- Zusätzlich wird der Snapshot nach reload_every Sekunden neu geladen
+"""
+import os
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+from applog import get_logger
+
+log = get_logger(__name__)
+
+CHANNEL = "pools_changed"
+
+
+class PoolSnapshot:
+    """Unveränderlicher Stand der Pool-Konfiguration (pools nicht verändern)"""
+
+    def __init__(self, pools, etag, body, loaded_at):
+        self.pools = pools
+        self.etag = etag
+        self.body = body          # http_cache.PrecompressedBody mit dem JSON
+        self.loaded_at = loaded_at
+
+
+class PoolConfigCache:
+    def __init__(self, dsn, load, reload_every=300.0, health_every=30.0):
+        # load() -> PoolSnapshot direkt aus der Datenbank
+        self.dsn = dsn
+        self._load = load
+        self.reload_every = reload_every
+        self.health_every = health_every
+
+        self._snapshot = None
+        self._generation = 0      # wird bei jeder Invalidierung erhöht
+        self._connected = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.hits = 0
+        self.loads = 0
+        self.bypasses = 0
+        self.notifications = 0
+        self.reconnects = 0
+
+    # ---------- Lesen ----------
+
+    def get(self):
+        """Aktueller Snapshot; lädt bei Bedarf (einmal für alle wartenden Threads)"""
+        self.ensure_running()
+        snapshot = self._snapshot
+        if snapshot is not None and self._connected and self._fresh(snapshot):
+            self.hits += 1
+            return snapshot
+
+        if not self._connected:
+            # Ohne LISTEN keine Garantie gegen veraltete Daten: jedes Mal aus der DB
+            self.bypasses += 1
+            return self._load()
+
+        with self._load_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and self._fresh(snapshot):
+                self.hits += 1
+                return snapshot
+            generation = self._generation
+            snapshot = self._load()
+            self.loads += 1
+            with self._lock:
+                # Während des Ladens invalidiert? Dann nicht speichern (evtl. veraltet)
+                if generation == self._generation and self._connected:
+                    self._snapshot = snapshot
+            return snapshot
+
+    def _fresh(self, snapshot):
+        return time.monotonic() - snapshot.loaded_at < self.reload_every
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    # ---------- LISTEN-Thread ----------
+
+    def ensure_running(self):
+        """Startet den LISTEN-Thread (einmal pro Prozess, auch nach fork())"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Geerbte Verbindung/Snapshot gehören dem Elternprozess
+                self._pid = os.getpid()
+                self._thread = None
+                self._connected = False
+                self._snapshot = None
+                self._generation += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pool-cache-listener", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                # Was vor dem LISTEN geändert wurde, ist evtl. nicht im Snapshot
+                self.invalidate()
+                self._connected = True
+                backoff = 1.0
+                self._listen(conn)
+            except Exception as e:
+                if self._connected:
+                    log.warning("⚠️ Pool-Cache: LISTEN-Verbindung getrennt, lese direkt aus der DB",
+                                error=str(e))
+            finally:
+                self._connected = False
+                self.invalidate()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            self.reconnects += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def _listen(self, conn):
+        last_health = time.monotonic()
+        while True:
+            ready, _, _ = select.select([conn], [], [], min(5.0, self.health_every))
+            if ready:
+                conn.poll()
+                if conn.notifies:
+                    self.notifications += len(conn.notifies)
+                    conn.notifies.clear()
+                    self.invalidate()
+            elif time.monotonic() - last_health >= self.health_every:
+                # Still gestorbene TCP-Verbindungen erkennen
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                last_health = time.monotonic()
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "listening": self._connected,
+            "cached": snapshot is not None,
+            "ageSeconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "etag": snapshot.etag if snapshot else None,
+            "hits": self.hits,
+            "loads": self.loads,
+            "bypasses": self.bypasses,
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
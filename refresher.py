@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Hintergrund-Refresher für Google Sheets.
+
+Jedes konfigurierte Sheet wird in einem eigenen Thread im eigenen Takt
+(mit Jitter) geladen und geparst. Request-Handler lesen nur noch den
+lokalen, bereits geparsten Stand - ein langsames oder nicht erreichbares
+Google blockiert keinen gunicorn-Worker mehr.
+
+Nach mehreren Fehlschlägen in Folge öffnet ein Circuit-Breaker und pausiert
+die Abrufe (mit wachsender Wartezeit), statt Google weiter zu belasten.
+
+Optional (snapshots, siehe snapshot_store.py): jeder erfolgreiche Stand wird auf
+der Platte gespeichert; ein neuer Worker startet mit dem letzten Snapshot statt
+leer, und solange ein Sheet nie erfolgreich geladen wurde, wird erneut im
+Snapshot nachgesehen (evtl. hat ein anderer Worker inzwischen Daten).
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+
+from applog import get_logger
+
+log = get_logger(__name__)
+
+
+class CircuitBreaker:
+    """closed -> (failure_threshold Fehler) -> open -> (cooldown) -> half-open -> closed/open"""
+
+    def __init__(self, failure_threshold=3, cooldown=30.0, max_cooldown=600.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None:
+            # Probe im half-open Zustand fehlgeschlagen: länger warten
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_at = time.monotonic()
+        elif self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def remaining(self):
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+class SheetJob:
+    def __init__(self, name, sheet_id, gid, interval, parse, parse_rows, jitter):
+        self.name = name
+        self.sheet_id = sheet_id
+        self.gid = gid
+        self.interval = interval
+        self.parse = parse          # parse(csv_text, digest) -> geparster Wert
+        self.parse_rows = parse_rows  # parse_rows(zeilen_iterator) -> geparster Wert (Streaming)
+        self.jitter = jitter
+        self.breaker = CircuitBreaker()
+        self.value = None
+        self.digest = None
+        self.updated_at = None      # time.time() des letzten erfolgreichen Abrufs
+        self.loaded = threading.Event()  # gesetzt nach dem ersten erfolgreichen Abruf
+        self.origin = None          # "live" (selbst geladen) oder "snapshot" (von der Platte)
+        self.last_error = None
+        self.fetches = 0
+        self.failures = 0
+        self.parses = 0
+
+    def next_delay(self):
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class SheetRefresher:
+    def __init__(self, fetch, jitter=0.2, fetch_rows=None, snapshots=None):
+        # fetch(sheet_id, gid) -> CSV-Text oder None bei Fehler
+        # fetch_rows(sheet_id, gid, parse_rows) -> (wert, sha1) oder None (zeilenweise, ohne Volltext)
+        # snapshots: SnapshotStore (save/load) oder None
+        self._fetch = fetch
+        self._fetch_rows = fetch_rows
+        self._snapshots = snapshots
+        self.jitter = jitter
+        self._jobs = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def add_job(self, name, sheet_id, gid, interval, parse=None, parse_rows=None):
+        """Genau eins von parse (CSV-Text) oder parse_rows (Zeilen-Iterator, braucht fetch_rows)"""
+        if (parse is None) == (parse_rows is None):
+            raise ValueError("add_job: entweder parse oder parse_rows angeben")
+        if parse_rows is not None and self._fetch_rows is None:
+            raise ValueError("add_job: parse_rows braucht fetch_rows")
+        self._jobs[name] = SheetJob(name, sheet_id, gid, interval, parse, parse_rows, self.jitter)
+
+    def ensure_running(self):
+        """Startet die Refresh-Threads (einmal pro Prozess, auch nach fork())"""
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads.values()):
+            return
+        if self._pid != os.getpid():
+            # Neuer Worker: erst den letzten Stand von der Platte, dann live nachladen
+            for job in self._jobs.values():
+                self._seed(job)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._threads = {}
+            for name, job in self._jobs.items():
+                thread = self._threads.get(name)
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(
+                        target=self._run, args=(job,), name=f"sheet-refresher-{name}", daemon=True
+                    )
+                    self._threads[name] = thread
+                    thread.start()
+
+    def _run(self, job):
+        while True:
+            if job.breaker.allow():
+                self.refresh_now(job.name)
+                delay = job.next_delay()
+            else:
+                delay = job.breaker.remaining()
+            time.sleep(max(0.1, delay))
+
+    def refresh_now(self, name):
+        """Lädt ein Sheet sofort; True bei Erfolg"""
+        job = self._jobs[name]
+        job.fetches += 1
+        try:
+            if job.parse_rows is not None:
+                # Parsen läuft beim Lesen mit; das Ergebnis ist immer aktuell (auch wenn der
+                # Parser vom Datum abhängt), parses zählt nur geänderte Sheet-Stände
+                result = self._fetch_rows(job.sheet_id, job.gid, job.parse_rows)
+                if result is None:
+                    raise RuntimeError("Sheet nicht erreichbar")
+                value, digest = result
+                if digest != job.digest:
+                    job.parses += 1
+                with self._lock:
+                    job.value = value
+                    job.digest = digest
+            else:
+                csv_text = self._fetch(job.sheet_id, job.gid)
+                if not csv_text:
+                    raise RuntimeError("Sheet nicht erreichbar")
+
+                digest = hashlib.sha1(csv_text.encode('utf-8')).hexdigest()
+                if digest != job.digest:
+                    value = job.parse(csv_text, digest)
+                    with self._lock:
+                        job.value = value
+                        job.digest = digest
+                    job.parses += 1
+            job.updated_at = time.time()
+            job.origin = "live"
+            job.loaded.set()
+            job.last_error = None
+            job.breaker.record_success()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            job.breaker.record_failure()
+            if job.breaker.state == "open":
+                log.warning("⚡ Circuit-Breaker offen", sheet=job.name, failures=job.breaker.failures,
+                            retry_in=round(job.breaker.remaining()))
+            if job.origin != "live":
+                self._seed(job)
+            return False
+        if self._snapshots is not None:
+            try:
+                self._snapshots.save(job.name, job.value, job.updated_at)
+            except Exception as e:
+                log.warning("⚠️ Snapshot nicht gespeichert", sheet=job.name, error=str(e))
+        return True
+
+    def _seed(self, job):
+        """Übernimmt den Snapshot von der Platte, solange kein eigener Abruf geklappt hat"""
+        if self._snapshots is None or job.origin == "live":
+            return
+        entry = self._snapshots.load(job.name)
+        if entry is None:
+            return
+        value, fetched_at = entry
+        with self._lock:
+            if job.origin == "live" or (job.updated_at is not None and job.updated_at >= fetched_at):
+                return
+            job.value = value
+            job.updated_at = fetched_at
+            job.origin = "snapshot"
+        job.loaded.set()
+        log.info("📦 Sheet aus Snapshot geladen", sheet=job.name, age=round(time.time() - fetched_at))
+
+    def value(self, name):
+        """Zuletzt erfolgreich geparster Wert (oder None) - blockiert nie"""
+        job = self._jobs.get(name)
+        return job.value if job else None
+
+    def wait(self, name, timeout):
+        """Wie value(), wartet aber höchstens timeout Sekunden auf den ersten Abruf (Kaltstart)"""
+        job = self._jobs.get(name)
+        if job is None:
+            return None
+        job.loaded.wait(timeout)
+        return job.value
+
+    def origin(self, name):
+        """'live', 'snapshot' oder None (noch keine Daten)"""
+        job = self._jobs.get(name)
+        return job.origin if job else None
+
+    def age(self, name):
+        """Sekunden seit dem letzten erfolgreichen Abruf (oder None)"""
+        job = self._jobs.get(name)
+        if job is None or job.updated_at is None:
+            return None
+        return time.time() - job.updated_at
+
+    def stats(self):
+        return {
+            name: {
+                "interval": job.interval,
+                "breaker": job.breaker.state,
+                "ageSeconds": round(self.age(name), 1) if job.updated_at else None,
+                "origin": job.origin,
+                "fetches": job.fetches,
+                "failures": job.failures,
+                "parses": job.parses,
+                "lastError": job.last_error,
+            }
+            for name, job in self._jobs.items()
+        }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Vorberechneter Index über das Mitarbeiter-Sheet (Dienstplan).
+
+Das Sheet enthält den ganzen Monat/das ganze Jahr:
+- Zeile 4 (Index 3): Datumsangaben (06.10., 07.10., ...)
+- ab Zeile 5 (Index 4): eine Zeile pro Mitarbeiter, Schicht-Code pro Datumsspalte
+
+Statt pro Request das ganze Sheet zu scannen, wird es einmal in
+(Tag, Monat) -> (FRÜH, SPÄT, Täti) übersetzt.
+"""
+import re
+from functools import lru_cache
+
+DATE_ROW_INDEX = 3
+FIRST_EMPLOYEE_ROW = 4
+
+# Abwesenheitscodes, die nicht gezählt werden (wie doImportMitarbeiterData in index.html)
+ABSENCE_CODES = {'FT', 'A', 'U', 'K', 'URD', 'KA', 'HTVO', 'TLM'}
+
+_DATE_CELL = re.compile(r'(\d{1,2})\.(\d{1,2})\.')
+_LEADING_DIGITS = re.compile(r'^\d+\s*')
+
+EMPTY_COUNTS = (0, 0, 0)
+
+
+def normalize_shift_code(code):
+    """Wie normalizeShiftCode im Frontend: Zahlen am Anfang weg, Großbuchstaben, Ä/Ö/Ü -> A/O/U"""
+    schicht_code = _LEADING_DIGITS.sub('', code.strip()).upper()
+    return schicht_code.replace('Ä', 'A').replace('Ö', 'O').replace('Ü', 'U')
+
+
+@lru_cache(maxsize=4096)
+def classify_shift(code):
+    """
+    Ordnet einen Schicht-Code FRÜH (0), SPÄT (1) oder Täti (2) zu, sonst None.
+    Gleiche Regeln wie der Auto-Import im Frontend (doImportMitarbeiterData), damit
+    /api/stream dieselben Zahlen speichert.
+    """
+    schicht_code = normalize_shift_code(code)
+    if not schicht_code or schicht_code == '-' or schicht_code in ABSENCE_CODES:
+        return None
+
+    if schicht_code == 'F' or schicht_code.startswith('FRUH') or schicht_code.startswith('FRUEH'):
+        return 0
+    if schicht_code.startswith('SPAT'):
+        return 1
+    if schicht_code.startswith('TATI') or schicht_code == 'ROT':
+        return 2
+    return None
+
+
+def date_key(date):
+    """'2025-10-06' -> (6, 10), bei ungültigem Format None"""
+    date_parts = date.split('-')
+    if len(date_parts) != 3:
+        return None
+    try:
+        return int(date_parts[2]), int(date_parts[1])
+    except ValueError:
+        return None
+
+
+class RosterIndex:
+    """Schichtzählungen pro Datum, aufgebaut aus einem CSV-Export"""
+
+    def __init__(self, counts, digest=None):
+        self.counts = counts      # (tag, monat) -> (frueh, spat, taeti)
+        self.digest = digest      # Hash des CSV-Texts, aus dem der Index stammt
+
+    def lookup(self, date):
+        """Liefert (frueh, spat, taeti) für 'YYYY-MM-DD' oder None, wenn das Datum fehlt"""
+        key = date_key(date)
+        if key is None:
+            return None
+        return self.counts.get(key)
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def build_roster_index_from_rows(rows, digest=None, keep_date=None, max_blank_rows=None):
+    """
+    Baut den Index zeilenweise aus einem CSV-Zeilen-Iterator (z.B. direkt aus der HTTP-Antwort).
+
+    - Im Speicher liegt nur die aktuelle Zeile plus die Zähler der benötigten Datumsspalten
+    - keep_date((tag, monat)) -> bool: nur diese Datumsspalten auswerten (None = alle)
+    - max_blank_rows: nach so vielen Zeilen ohne Namen in Folge ist der Dienstplan zu Ende,
+      der Rest des Exports wird nicht mehr gelesen (None = bis zum Ende)
+    """
+    rows = iter(rows)
+    head = []
+    for row in rows:
+        head.append(row)
+        if len(head) > DATE_ROW_INDEX:
+            break
+    if len(head) <= DATE_ROW_INDEX:
+        return None
+
+    # Spalte -> (tag, monat); bei doppelten Daten gewinnt die erste Spalte
+    columns = {}
+    seen = set()
+    for col_index, cell in enumerate(head[DATE_ROW_INDEX]):
+        match = _DATE_CELL.search(str(cell))
+        if not match:
+            continue
+        key = (int(match.group(1)), int(match.group(2)))
+        if key in seen:
+            continue
+        seen.add(key)
+        if keep_date is None or keep_date(key):
+            columns[col_index] = key
+    del head
+
+    totals = {key: [0, 0, 0] for key in columns.values()}
+    selected = sorted(columns.items())
+
+    row_count = DATE_ROW_INDEX + 1
+    blank_rows = 0
+    for row in rows:
+        row_count += 1
+        if not row or not row[0].strip():
+            blank_rows += 1
+            if max_blank_rows is not None and blank_rows >= max_blank_rows:
+                break
+            continue
+        blank_rows = 0
+        row_length = len(row)
+        for col_index, key in selected:
+            if col_index >= row_length:
+                break
+            shift = classify_shift(row[col_index])
+            if shift is not None:
+                totals[key][shift] += 1
+
+    if row_count < 6:
+        return None
+
+    return RosterIndex({key: tuple(c) for key, c in totals.items()}, digest)
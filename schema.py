@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Datenbank-Schema als nummerierte Migrationen.
+
+- Jede Migration läuft genau einmal (Tabelle schema_migrations), alle offenen
+  in EINER Transaktion; Workers und Instanzen, die gleichzeitig starten, werden
+  über ein Advisory-Lock serialisiert
+- Die Migrationen sind idempotent (IF NOT EXISTS): bestehende Datenbanken, deren
+  Tabellen noch von Hand (RENDER_DEPLOYMENT.md) angelegt wurden, werden nur ergänzt
+- Neue Änderungen immer als neue Migration anhängen, bestehende nie verändern
+
+Start (z.B. beim Deploy):  python3 schema.py --database-url postgresql://...
+Der Server führt offene Migrationen sonst beim ersten Request pro Worker aus.
+"""
+import argparse
+import os
+import threading
+import time
+
+import psycopg2
+
+from applog import get_logger
+
+log = get_logger(__name__)
+
+SCHEMA_LOCK_ID = 74530002  # wie bisher in livevol_store.py (gemischte Deploys bleiben serialisiert)
+
+MIGRATIONS = (
+    (1, "pools und mitarbeiter", """
+        CREATE TABLE IF NOT EXISTS pools (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            start_time TEXT NOT NULL,
+            deadline TEXT NOT NULL,
+            factor NUMERIC NOT NULL DEFAULT 1,
+            rate NUMERIC NOT NULL DEFAULT 80,
+            use_rotation BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS mitarbeiter (
+            id SERIAL PRIMARY KEY,
+            date DATE NOT NULL UNIQUE,
+            frueh INTEGER NOT NULL DEFAULT 0,
+            spat INTEGER NOT NULL DEFAULT 0,
+            taeti INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    # Eindeutige Indizes für ON CONFLICT (name/date), Bereichsabfragen und Exporte nach Datum.
+    # Bei Tabellen mit UNIQUE-Constraint existieren sie unter diesem Namen bereits (no-op).
+    (2, "indizes auf mitarbeiter.date und pools.name", """
+        CREATE UNIQUE INDEX IF NOT EXISTS mitarbeiter_date_key ON mitarbeiter (date);
+        CREATE UNIQUE INDEX IF NOT EXISTS pools_name_key ON pools (name);
+    """),
+    (3, "live-vol zeitreihen", """
+        CREATE TABLE IF NOT EXISTS livevol_series (
+            id SMALLSERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS livevol_snapshots (
+            ts TIMESTAMPTZ PRIMARY KEY,
+            series_ids SMALLINT[] NOT NULL,
+            vols INTEGER[] NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS livevol_buckets (
+            resolution INTEGER NOT NULL,
+            series_id SMALLINT NOT NULL,
+            bucket_start TIMESTAMPTZ NOT NULL,
+            n INTEGER NOT NULL,
+            vsum BIGINT NOT NULL,
+            vmin INTEGER NOT NULL,
+            vmax INTEGER NOT NULL,
+            vlast INTEGER NOT NULL,
+            last_ts TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (resolution, series_id, bucket_start)
+        );
+    """),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(cur):
+    """Führt alle offenen Migrationen im Cursor (in dessen Transaktion) aus; liefert die neuen Versionen"""
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    done = {row[0] for row in cur.fetchall()}
+
+    applied = []
+    for version, name, sql in MIGRATIONS:
+        if version in done:
+            continue
+        cur.execute(sql)
+        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        applied.append(version)
+        log.info("🗄️ Migration ausgeführt", version=version, name=name)
+    return applied
+
+
+class SchemaMigrator:
+    """Führt die Migrationen einmal pro Prozess aus (beim ersten Request, ohne andere Requests zu blockieren)"""
+
+    def __init__(self, get_connection, retry_every=30.0):
+        # get_connection(operation) -> Context-Manager mit DB-Verbindung (commit beim Verlassen)
+        self._get_connection = get_connection
+        self.retry_every = retry_every
+        self._lock = threading.Lock()
+        self._ready = False
+        self._last_attempt = None
+
+        self.applied = []
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def ensure(self):
+        """True, wenn das Schema aktuell ist; versucht es sonst (höchstens alle retry_every Sekunden)"""
+        if self._ready:
+            return True
+        if (self._last_attempt is not None and time.monotonic() - self._last_attempt < self.retry_every) \
+                or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._ready:
+                return True
+            self._last_attempt = time.monotonic()
+            with self._get_connection("schema_migrate") as conn:
+                with conn.cursor() as cur:
+                    applied = migrate(cur)
+            self.applied.extend(applied)
+            self._ready = True
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            log.warning("⚠️ Migrationen fehlgeschlagen, neuer Versuch später", error=str(e),
+                        retry_in=self.retry_every)
+            return False
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {
+            "ready": self._ready,
+            "latestVersion": LATEST_VERSION,
+            "applied": list(self.applied),
+            "failures": self.failures,
+            "lastError": self.last_error,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Datenbank-Migrationen ausführen")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url oder DATABASE_URL erforderlich")
+
+    conn = psycopg2.connect(args.database_url)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                applied = migrate(cur)
+    finally:
+        conn.close()
+    if applied:
+        print(f"✅ Migrationen {', '.join(map(str, applied))} ausgeführt (Stand {LATEST_VERSION})")
+    else:
+        print(f"✅ Schema aktuell (Stand {LATEST_VERSION})")
+
+
+if __name__ == '__main__':
+    main()
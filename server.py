@@ -1,40 +1,117 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request, send_from_directory, make_response
+from flask import Flask, Response, g, jsonify, request, send_from_directory, make_response, stream_with_context
 from flask_cors import CORS
 import os
 import csv
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
 import json
 from io import StringIO
 import time
+import datetime
+import decimal
+import hashlib
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from zoneinfo import ZoneInfo
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from contextlib import contextmanager
+from db_pool import ConnectionPool
+from roster import build_roster_index_from_rows, date_key
+from csv_stream import parse_csv_response
+import allocation
+from simulator import SLOT_MINUTES as SIMULATION_SLOTS, Simulator, format_time
+from stream import StreamHub
+from http_cache import PrecompressedBody, StaticFiles, finalize_response
+from pool_cache import CHANNEL as POOLS_CHANNEL, PoolConfigCache, PoolSnapshot
+from refresher import SheetRefresher
+from snapshot_store import SnapshotStore
+from write_behind import WriteBehindQueue
+from schema import SchemaMigrator
+from livevol_store import RESOLUTIONS as LIVEVOL_RESOLUTIONS, LivevolStore, pick_resolution
+from applog import get_logger
+import metrics
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+log = get_logger("server")
+
+# Prometheus-Metriken (GET /metrics)
+metrics_registry = metrics.Registry()
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "Dauer der HTTP-Requests", ("route", "method"))
+HTTP_REQUESTS = metrics_registry.counter(
+    "http_requests_total", "HTTP-Requests nach Status", ("route", "method", "status"))
+SHEETS_FETCH_SECONDS = metrics_registry.histogram(
+    "sheets_fetch_duration_seconds", "Dauer eines Google-Sheets-Abrufs (inkl. Retries)", ("sheet",))
+SHEETS_FETCH_ATTEMPTS = metrics_registry.counter(
+    "sheets_fetch_attempts_total", "Einzelne HTTP-Versuche gegen Google Sheets nach Ergebnis", ("sheet", "status"))
+SHEETS_FETCH_RETRIES = metrics_registry.counter(
+    "sheets_fetch_retries_total", "Wiederholungen von Google-Sheets-Abrufen nach Grund", ("sheet", "reason"))
+SHEETS_PARSE_SECONDS = metrics_registry.histogram(
+    "sheets_parse_duration_seconds", "Dauer des Parsens eines Sheets (zeilenweise: inkl. Download)", ("sheet",))
+DB_ACQUIRE_SECONDS = metrics_registry.histogram(
+    "db_pool_acquire_seconds", "Wartezeit auf eine Verbindung aus dem Pool", ("operation",))
+DB_TRANSACTION_SECONDS = metrics_registry.histogram(
+    "db_transaction_duration_seconds", "Dauer einer DB-Transaktion (Queries + Commit)", ("operation", "outcome"))
+DASHBOARD_SOURCE_SECONDS = metrics_registry.histogram(
+    "dashboard_source_duration_seconds", "Dauer einer Quelle von /api/dashboard", ("source", "outcome"))
+EXPORT_ROWS = metrics_registry.counter(
+    "export_rows_total", "Über /api/export/* gestreamte Zeilen", ("dataset", "format"))
+
 # Database connection
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
-    print("⚠️ WARNING: DATABASE_URL not set - database features will be disabled")
+    log.warning("⚠️ DATABASE_URL not set - database features will be disabled")
+
+# Connection-Pool pro Worker (statt neuer Verbindung pro Request)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+db_pool = ConnectionPool(
+    DATABASE_URL,
+    minconn=DB_POOL_MIN,
+    maxconn=DB_POOL_MAX,
+    ping_after=DB_POOL_PING_AFTER,
+    acquire_timeout=DB_POOL_TIMEOUT,
+) if DATABASE_URL else None
 
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections"""
+def get_db_connection(operation="other"):
+    """Context manager for database connections (aus dem Pool), misst Wartezeit und Transaktionsdauer"""
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable not set")
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
-        yield conn
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+    acquire_started = time.perf_counter()
+    with db_pool.connection() as conn:
+        started = time.perf_counter()
+        DB_ACQUIRE_SECONDS.observe(started - acquire_started, operation)
+        try:
+            yield conn
+            conn.commit()
+            DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started, operation, "commit")
+        except Exception as e:
+            DB_TRANSACTION_SECONDS.observe(time.perf_counter() - started, operation, "error")
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass  # kaputte Verbindung wird vom Pool verworfen
+            raise e
+
+# Offene Migrationen (schema.py) einmal pro Worker beim ersten Request
+schema_migrator = SchemaMigrator(get_db_connection) if DATABASE_URL else None
+
+@app.before_request
+def ensure_database_schema():
+    if schema_migrator is not None:
+        schema_migrator.ensure()
 
 # Google Sheets Config - Aus Umgebungsvariablen laden (sicher für GitHub!)
 GOOGLE_SHEETS_ID = os.getenv("POOL_CONFIG_SHEET_ID", "14e85oqQrUjywXjNasJz7azME0t18RJEEldgRwCRFiH4")
@@ -42,48 +119,111 @@ LIVE_VOL_SHEET_ID = os.getenv("LIVE_VOL_SHEET_ID", "1EhhG5Da2kDpLMktcrSdn1DTMnr_
 LIVEVOL_SHEET_GID = "0"  # Erster Tab für Live-Vol Daten
 POOLS_CONFIG_SHEET_GID = "0"  # Pool-Konfiguration Tab
 MITARBEITER_SHEET_ID = os.getenv("MITARBEITER_SHEET_ID", "15yfflPhE6Lqykm8aqacnZcrJj0x0Y1Yd")
+# Nur für Tests/Benchmarks: lokaler Ersatz für den CSV-Export von Google
+GOOGLE_SHEETS_BASE_URL = os.getenv("GOOGLE_SHEETS_BASE_URL", "https://docs.google.com").rstrip('/')
+
+# Sheet-Namen statt IDs als Metrik-Label
+SHEET_NAMES = {
+    GOOGLE_SHEETS_ID: "pool_config",
+    LIVE_VOL_SHEET_ID: "livevol",
+    MITARBEITER_SHEET_ID: "mitarbeiter",
+}
+
+# Keep-Alive zu Google: eine Session mit Verbindungspool pro Prozess statt requests.get
+# (neue TCP/TLS-Verbindung pro Abruf); gleichzeitige Abrufe teilen sich den Pool
+SHEETS_HTTP_POOL_SIZE = int(os.getenv("SHEETS_HTTP_POOL_SIZE", "8"))
+_sheets_session = None
+_sheets_session_pid = None
+_sheets_session_lock = threading.Lock()
+
+def sheets_session():
+    """requests.Session für Google Sheets (einmal pro Prozess, auch nach fork())"""
+    global _sheets_session, _sheets_session_pid
+    if _sheets_session_pid != os.getpid():
+        with _sheets_session_lock:
+            if _sheets_session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SHEETS_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sheets_session = session
+                _sheets_session_pid = os.getpid()
+    return _sheets_session
 
 def fetch_google_sheet_csv(sheet_id, gid="0", max_retries=3):
     """Lädt Google Sheet als CSV mit Retry-Logik"""
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+    sheet = SHEET_NAMES.get(sheet_id, "other")
+    with SHEETS_FETCH_SECONDS.time(sheet):
+        response = _open_google_sheet(sheet, sheet_id, gid, max_retries)
+        return response.text if response is not None else None
+
+def fetch_google_sheet_rows(sheet_id, gid, parse_rows, max_retries=3):
+    """
+    Wie fetch_google_sheet_csv, aber ohne den Export komplett in den Speicher zu laden:
+    parse_rows(rows) liest die CSV-Zeilen direkt aus der HTTP-Antwort.
+    Liefert (wert, sha1_der_gelesenen_bytes) oder None, wenn das Sheet nicht erreichbar ist.
+    """
+    sheet = SHEET_NAMES.get(sheet_id, "other")
+    with SHEETS_FETCH_SECONDS.time(sheet):
+        response = _open_google_sheet(sheet, sheet_id, gid, max_retries, stream=True)
+        if response is None:
+            return None
+        with response:
+            return parse_csv_response(response, parse_rows)
+
+def _open_google_sheet(sheet, sheet_id, gid, max_retries, stream=False):
+    """Gemeinsame Retry-Logik: erfolgreiche requests-Antwort oder None"""
+    url = f"{GOOGLE_SHEETS_BASE_URL}/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
     
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, timeout=15)
+            response = sheets_session().get(url, timeout=15, stream=stream)
+            SHEETS_FETCH_ATTEMPTS.inc(sheet, response.status_code)
             response.raise_for_status()
-            return response.text
+            return response
         except requests.exceptions.HTTPError as e:
+            e.response.close()
             if e.response.status_code == 400:
-                print(f"❌ Google Sheet nicht öffentlich zugänglich (400 Bad Request)")
-                print(f"   URL: {url}")
-                print(f"   Bitte Sheet öffentlich teilen (Lesezugriff)")
+                log.error("❌ Google Sheet nicht öffentlich zugänglich (400 Bad Request) - "
+                          "bitte Sheet öffentlich teilen (Lesezugriff)", sheet=sheet, url=url)
                 return None
             elif e.response.status_code == 429:
                 # Rate Limit erreicht
                 wait_time = (2 ** attempt) * 0.5  # Exponential backoff: 0.5s, 1s, 2s
-                print(f"⚠️ Rate Limit erreicht, warte {wait_time}s (Versuch {attempt + 1}/{max_retries})")
+                SHEETS_FETCH_RETRIES.inc(sheet, "429")
+                log.warning("⚠️ Rate Limit erreicht", sheet=sheet, wait=wait_time,
+                            attempt=attempt + 1, max_retries=max_retries)
                 time.sleep(wait_time)
                 continue
             else:
-                print(f"❌ HTTP Error {e.response.status_code}: {e}")
+                log.error("❌ HTTP Error", sheet=sheet, status=e.response.status_code, error=str(e))
                 return None
         except requests.exceptions.Timeout:
             wait_time = (2 ** attempt) * 0.5
-            print(f"⚠️ Timeout, wiederhole in {wait_time}s (Versuch {attempt + 1}/{max_retries})")
+            SHEETS_FETCH_ATTEMPTS.inc(sheet, "timeout")
+            SHEETS_FETCH_RETRIES.inc(sheet, "timeout")
+            log.warning("⚠️ Timeout beim Laden von Google Sheets", sheet=sheet, wait=wait_time,
+                        attempt=attempt + 1, max_retries=max_retries)
             time.sleep(wait_time)
             continue
         except Exception as e:
-            print(f"❌ Fehler beim Laden von Google Sheets: {e}")
+            SHEETS_FETCH_ATTEMPTS.inc(sheet, "error")
+            log.error("❌ Fehler beim Laden von Google Sheets", sheet=sheet, error=str(e))
             if attempt < max_retries - 1:
                 wait_time = (2 ** attempt) * 0.5
-                print(f"   Wiederhole in {wait_time}s...")
+                SHEETS_FETCH_RETRIES.inc(sheet, "error")
+                log.info("   Wiederhole", sheet=sheet, wait=wait_time)
                 time.sleep(wait_time)
             else:
                 return None
     
-    print(f"❌ Alle {max_retries} Versuche fehlgeschlagen")
+    log.error("❌ Alle Versuche fehlgeschlagen", sheet=sheet, max_retries=max_retries)
     return None
 
+def get_roster_index():
+    """Liefert den RosterIndex für das Mitarbeiter-Sheet (vom Hintergrund-Refresher, blockiert nie)"""
+    return sheet_refresher.value("mitarbeiter")
+
 def get_default_pools():
     """Gibt Standard-Pools zurück (Fallback wenn Google Sheets nicht erreichbar)"""
     return [
@@ -107,6 +247,9 @@ def get_default_pools():
         {"name": "ZB Pakete heute", "start": "06:00", "deadline": "17:00", "factor": 1, "rate": 80, "schicht": "ROTATION"},
     ]
 
+# Nach so vielen leeren Zeilen in Folge gilt ein Sheet als zu Ende (Rest des Exports wird nicht gelesen)
+CSV_MAX_BLANK_ROWS = int(os.getenv("CSV_MAX_BLANK_ROWS", "50"))
+
 def parse_pools_from_csv(csv_text):
     """
     Parst Pool-Konfiguration aus CSV
@@ -117,171 +260,405 @@ def parse_pools_from_csv(csv_text):
     DE bis 10:00,06:00,10:00,1,80,JA
     ...
     """
+    if not csv_text:
+        log.warning("⚠️ Kein CSV-Text vorhanden, verwende Standard-Pools")
+        return get_default_pools()
+    
+    try:
+        return parse_pools_from_rows(csv.reader(StringIO(csv_text)))
+    except Exception as e:
+        log.exception("❌ Fehler beim Parsen des CSV, verwende Standard-Pools", error=str(e))
+        return get_default_pools()
+
+def parse_pools_from_rows(rows):
+    """
+    Parst Pool-Konfiguration zeilenweise aus einem CSV-Zeilen-Iterator
+    (z.B. direkt aus der HTTP-Antwort, siehe fetch_google_sheet_rows).
+    Lesefehler des Iterators werden nicht abgefangen.
+    """
     pools = []
+    rows = iter(rows)
     
-    if not csv_text:
-        print("⚠️ Kein CSV-Text vorhanden, verwende Standard-Pools")
+    # Erste Zeile ist Header
+    header_row = next(rows, None)
+    if header_row is None:
+        log.warning("⚠️ Zu wenige Zeilen in CSV, verwende Standard-Pools", rows=0)
         return get_default_pools()
     
+    header = [col.strip().upper() for col in header_row]
+    log.debug("📊 CSV Header", header=header)
+    
+    # Finde Spalten-Indizes
     try:
-        csv_file = StringIO(csv_text)
-        reader = csv.reader(csv_file)
-        rows = list(reader)
-        
-        print(f"📋 CSV hat {len(rows)} Zeilen (inkl. Header)")
-        
-        if len(rows) < 2:
-            print("⚠️ Zu wenige Zeilen in CSV, verwende Standard-Pools")
-            return get_default_pools()
-        
-        # Erste Zeile ist Header
-        header = [col.strip().upper() for col in rows[0]]
-        print(f"📊 CSV Header: {header}")
+        name_idx = header.index('NAME')
+        start_idx = header.index('START')
+        deadline_idx = header.index('DEADLINE')
+        factor_idx = header.index('FAKTOR')
+        rate_idx = header.index('RATE')
+        rotation_idx = header.index('ROTATION')
+    except ValueError as e:
+        log.warning("⚠️ Fehlende Spalte in CSV, verwende Standard-Pools", error=str(e), header=header)
+        return get_default_pools()
+    
+    min_columns = max(name_idx, start_idx, deadline_idx, factor_idx, rate_idx, rotation_idx) + 1
+    blank_rows = 0
+    line_count = 1
+    
+    # Parse Pool-Daten (Zeile 2 ist die erste Datenzeile)
+    for i, row in enumerate(rows, start=2):
+        line_count = i
+        # Skip komplett leere Zeilen; viele in Folge = Ende der Daten
+        if not any(cell.strip() for cell in row):
+            blank_rows += 1
+            if blank_rows >= CSV_MAX_BLANK_ROWS:
+                log.debug("Ende der Daten erreicht, restliche Zeilen werden nicht gelesen", line=i)
+                break
+            log.debug("Zeile komplett leer, überspringe", line=i)
+            continue
+        blank_rows = 0
+            
+        if len(row) < min_columns:
+            log.warning("⚠️ Zeile hat zu wenige Spalten, überspringe", line=i, columns=len(row), row=row)
+            continue
         
-        # Finde Spalten-Indizes
         try:
-            name_idx = header.index('NAME')
-            start_idx = header.index('START')
-            deadline_idx = header.index('DEADLINE')
-            factor_idx = header.index('FAKTOR')
-            rate_idx = header.index('RATE')
-            rotation_idx = header.index('ROTATION')
-        except ValueError as e:
-            print(f"⚠️ Fehlende Spalte in CSV: {e}, verwende Standard-Pools")
-            print(f"   Gefundene Spalten: {header}")
-            return get_default_pools()
-        
-        # Parse Pool-Daten (START bei rows[1] für erste Datenzeile)
-        for i, row in enumerate(rows[1:], start=2):
-            # Skip komplett leere Zeilen
-            if not any(cell.strip() for cell in row):
-                print(f"⚠️ Zeile {i}: Komplett leer, überspringe")
-                continue
-                
-            if len(row) < max(name_idx, start_idx, deadline_idx, factor_idx, rate_idx, rotation_idx) + 1:
-                print(f"⚠️ Zeile {i} hat zu wenige Spalten ({len(row)}), überspringe: {row}")
-                continue
+            name_value = row[name_idx].strip()
             
-            try:
-                name_value = row[name_idx].strip()
-                
-                # Skip Zeilen mit leerem Namen
-                if not name_value:
-                    print(f"⚠️ Zeile {i}: Name ist leer, überspringe")
-                    continue
-                
-                rotation_value = row[rotation_idx].strip().upper()
-                use_rotation = rotation_value == 'JA'
-                
-                pool = {
-                    "name": name_value,
-                    "start": row[start_idx].strip() or "06:00",
-                    "deadline": row[deadline_idx].strip() or "17:00",
-                    "factor": float(row[factor_idx].strip()) if row[factor_idx].strip() else 1,
-                    "rate": int(row[rate_idx].strip()) if row[rate_idx].strip() else 80,
-                    "useRotation": use_rotation
-                }
-                
-                pools.append(pool)
-                print(f"✓ Pool geladen: {pool['name']} (START: {pool['start']}, DEADLINE: {pool['deadline']}, ROTATION: {rotation_value})")
-                
-            except (ValueError, IndexError) as e:
-                print(f"⚠️ Fehler beim Parsen von Zeile {i}: {e}")
-                print(f"   Zeile Inhalt: {row}")
+            # Skip Zeilen mit leerem Namen
+            if not name_value:
+                log.debug("Name ist leer, überspringe", line=i)
                 continue
-        
-        if pools:
-            print(f"✅ {len(pools)} Pools erfolgreich aus Google Sheets geladen")
-            return pools
-        else:
-            print("⚠️ Keine gültigen Pools gefunden, verwende Standard-Pools")
-            return get_default_pools()
             
-    except Exception as e:
-        print(f"❌ Fehler beim Parsen des CSV: {e}, verwende Standard-Pools")
-        import traceback
-        traceback.print_exc()
+            rotation_value = row[rotation_idx].strip().upper()
+            use_rotation = rotation_value == 'JA'
+            
+            pool = {
+                "name": name_value,
+                "start": row[start_idx].strip() or "06:00",
+                "deadline": row[deadline_idx].strip() or "17:00",
+                "factor": float(row[factor_idx].strip()) if row[factor_idx].strip() else 1,
+                "rate": int(row[rate_idx].strip()) if row[rate_idx].strip() else 80,
+                "useRotation": use_rotation
+            }
+            
+            pools.append(pool)
+            log.debug("✓ Pool geladen", name=pool['name'], start=pool['start'],
+                      deadline=pool['deadline'], rotation=rotation_value)
+            
+        except (ValueError, IndexError) as e:
+            log.warning("⚠️ Fehler beim Parsen einer Zeile", line=i, error=str(e), row=row)
+            continue
+    
+    log.debug("📋 Pool-CSV gelesen", rows=line_count)
+    
+    if pools:
+        log.info("✅ Pools aus Google Sheets geladen", count=len(pools))
+        return pools
+    else:
+        log.warning("⚠️ Keine gültigen Pools gefunden, verwende Standard-Pools")
         return get_default_pools()
 
+def parse_livevol_from_csv(csv_text):
+    """
+    Parst Live-Vol Daten aus CSV (wie doImportPoolData im Frontend)
+    
+    Erwartetes Format (mit Header-Zeile, Komma ODER Semikolon):
+    POOL,LIVE-VOL
+    FR bis 08:45,1234
+    """
+    volumes = {}
+    if not csv_text:
+        return volumes
+    
+    for line in csv_text.splitlines()[1:]:
+        delimiter = ';' if ';' in line else ','
+        row = [cell.strip() for cell in line.split(delimiter)]
+        if len(row) < 2 or not row[0] or not row[1]:
+            continue
+        match = re.match(r'-?\d+', re.sub(r'[^\d-]', '', row[1]))
+        if not match:
+            continue
+        volumes[row[0]] = int(match.group(0))
+    
+    return volumes
+
+# ========== HINTERGRUND-REFRESHER ==========
+# Sheets werden im Hintergrund geladen und geparst; Request-Handler lesen nur lokalen Stand
+
+REFRESH_LIVEVOL_SECONDS = float(os.getenv("REFRESH_LIVEVOL_SECONDS", "3"))
+REFRESH_MITARBEITER_SECONDS = float(os.getenv("REFRESH_MITARBEITER_SECONDS", "30"))
+REFRESH_POOL_CONFIG_SECONDS = float(os.getenv("REFRESH_POOL_CONFIG_SECONDS", "300"))
+REFRESH_JITTER = float(os.getenv("REFRESH_JITTER", "0.2"))
+
+# Mitarbeiter-Sheet: nur Datumsspalten im Fenster heute ± N Tage auswerten (0 = alle)
+ROSTER_WINDOW_DAYS = int(os.getenv("ROSTER_WINDOW_DAYS", "0"))
+
+def roster_window():
+    """keep_date-Filter für build_roster_index_from_rows oder None (alle Spalten)"""
+    if ROSTER_WINDOW_DAYS <= 0:
+        return None
+    today = datetime.datetime.now(APP_TIMEZONE).date()
+    keys = {
+        ((today + datetime.timedelta(days=offset)).day, (today + datetime.timedelta(days=offset)).month)
+        for offset in range(-ROSTER_WINDOW_DAYS, ROSTER_WINDOW_DAYS + 1)
+    }
+    return keys.__contains__
+
+def parse_roster_rows(rows):
+    return build_roster_index_from_rows(rows, keep_date=roster_window(), max_blank_rows=CSV_MAX_BLANK_ROWS)
+
+def timed_parse(sheet, parse):
+    """Misst die Parse-Dauer eines Refresher-Jobs (sheets_parse_duration_seconds)"""
+    def wrapper(*args):
+        with SHEETS_PARSE_SECONDS.time(sheet):
+            return parse(*args)
+    return wrapper
+
+# Letzter erfolgreicher Stand auf der Platte, geteilt von allen Workern (siehe snapshot_store.py):
+# Kaltstarts und Ausfälle von Google/DB liefern echte Daten statt Standardwerten
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "einsatzplanung-snapshots"))
+SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("SNAPSHOT_MAX_AGE_HOURS", "24"))  # 0 = unbegrenzt
+snapshot_store = SnapshotStore(SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE_HOURS * 3600 or None)
+
+# Große Sheets (Dienstplan, Pool-Konfiguration) werden zeilenweise aus der HTTP-Antwort geparst,
+# Live-Vol (klein, Komma oder Semikolon pro Zeile) weiter über den CSV-Cache
+sheet_refresher = SheetRefresher(fetch_google_sheet_csv, jitter=REFRESH_JITTER, fetch_rows=fetch_google_sheet_rows,
+                                 snapshots=snapshot_store)
+sheet_refresher.add_job("livevol", LIVE_VOL_SHEET_ID, LIVEVOL_SHEET_GID, REFRESH_LIVEVOL_SECONDS,
+                        parse=timed_parse("livevol", lambda csv_text, digest: parse_livevol_from_csv(csv_text)))
+sheet_refresher.add_job("mitarbeiter", MITARBEITER_SHEET_ID, "0", REFRESH_MITARBEITER_SECONDS,
+                        parse_rows=timed_parse("mitarbeiter", parse_roster_rows))
+sheet_refresher.add_job("pool_config", GOOGLE_SHEETS_ID, POOLS_CONFIG_SHEET_GID, REFRESH_POOL_CONFIG_SECONDS,
+                        parse_rows=timed_parse("pool_config", parse_pools_from_rows))
+
+def snapshot_age(name):
+    """Alter in Sekunden, wenn das Sheet aus dem Snapshot stammt (noch nie live geladen), sonst None"""
+    if sheet_refresher.origin(name) != "snapshot":
+        return None
+    age = sheet_refresher.age(name)
+    return round(age, 1) if age is not None else None
+
+def with_snapshot_age(response, age):
+    """Setzt X-Snapshot-Age, wenn die Antwort aus einem Snapshot stammt"""
+    if age is not None:
+        response.headers['X-Snapshot-Age'] = str(int(age))
+    return response
+
+@app.before_request
+def start_background_refresh():
+    # Threads pro gunicorn-Worker (nach dem fork) starten
+    sheet_refresher.ensure_running()
+
+# ========== END HINTERGRUND-REFRESHER ==========
+
+# ========== METRIKEN ==========
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def observe_request(response):
+    """Dauer und Status pro Route (Regel statt konkreter URL, damit die Label-Menge begrenzt bleibt)"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, response.status_code)
+    return response
+
+# Vor finalize_response registriert -> läuft danach (Kompression wird mitgemessen)
+app.after_request(observe_request)
+
+# Statische Dateien: Content-Hash-ETag (304) + vorkomprimiert (br/gzip)
+static_files = StaticFiles('.')
+
+# ETags + 304 für API-Antworten, Kompression je nach Accept-Encoding
+app.after_request(finalize_response)
+
 @app.route('/')
 def index():
-    response = make_response(send_from_directory('.', 'index.html'))
-    # Disable caching for index.html to always get latest version
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+    # index.html wird immer revalidiert (neue Deploys sofort sichtbar), unverändert -> 304
+    response = static_files.response('index.html', immutable_if_versioned=False)
+    if response is None:
+        response = make_response(send_from_directory('.', 'index.html'))
+        response.headers['Cache-Control'] = 'no-cache'
     return response
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
+    # HTML immer revalidieren; andere Dateien mit ?v=<hash> sind ein Jahr cachebar
+    response = static_files.response(path, immutable_if_versioned=not path.endswith('.html'))
+    if response is None:
+        return send_from_directory('.', path)
+    return response
+
+@app.route('/api/assets', methods=['GET'])
+def get_asset_versions():
+    """Versionen (Content-Hash) für statische Dateien: ?path=a.png&path=b.js -> {pfad: url}"""
+    result = {}
+    for path in request.args.getlist('path'):
+        version = static_files.version(path)
+        if version:
+            result[path] = f"/{path}?v={version}"
+    return jsonify(result)
+
+def pool_row_key(name, start, deadline, factor, rate, use_rotation):
+    """Normalisierte Pool-Zeile für Vergleich und ETag (DB- und JSON-Typen vereinheitlicht)"""
+    return (
+        str(name),
+        str(start) if start is not None else None,
+        str(deadline) if deadline is not None else None,
+        float(factor) if factor is not None else None,
+        float(rate) if rate is not None else None,
+        bool(use_rotation),
+    )
+
+def pools_etag(rows):
+    """Versions-ETag über die gespeicherte Pool-Konfiguration (Reihenfolge nach id)"""
+    digest = hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+def load_pools_from_db():
+    """Pool-Konfiguration aus der Datenbank als Liste von Dicts (Reihenfolge nach id)"""
+    with get_db_connection("pools_load") as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT name, start_time as start, deadline, factor, rate, use_rotation as "useRotation"
+                FROM pools
+                ORDER BY id
+            """)
+            pools = cur.fetchall()
+    
+    # Konvertiere zu Liste von Dicts (für JSON)
+    return [dict(pool) for pool in pools]
+
+POOLS_SAVE_LOCK_ID = 74530001  # pg_advisory_xact_lock: serialisiert gleichzeitige Saves
+
+def build_pools_snapshot():
+    """Pools aus der DB mit ETag und fertig serialisiertem JSON-Body"""
+    pools_list = load_pools_from_db()
+    etag = pools_etag([
+        pool_row_key(p['name'], p['start'], p['deadline'], p['factor'], p['rate'], p['useRotation'])
+        for p in pools_list
+    ])
+    body = PrecompressedBody(f"{app.json.dumps(pools_list)}\n".encode('utf-8'), app.json.mimetype)
+    log.info("✅ Pools aus Datenbank geladen", count=len(pools_list), sample=True)
+    snapshot_store.save("pools", {"pools": pools_list, "etag": etag})
+    return PoolSnapshot(pools_list, etag, body, time.monotonic())
+
+# Snapshot pro Worker, invalidiert per LISTEN/NOTIFY (siehe pool_cache.py)
+POOL_CACHE_RELOAD_SECONDS = float(os.getenv("POOL_CACHE_RELOAD_SECONDS", "300"))
+pool_cache = PoolConfigCache(
+    DATABASE_URL, build_pools_snapshot, reload_every=POOL_CACHE_RELOAD_SECONDS
+) if DATABASE_URL else None
+
+def current_pools():
+    """Pool-Konfiguration (aus dem Snapshot, falls aktiv) - Liste nicht verändern"""
+    return pool_cache.get().pools if pool_cache else load_pools_from_db()
+
+def fallback_pools():
+    """
+    Pools, wenn die Datenbank nicht erreichbar ist: (pools, quelle, snapshot_alter)
+    Reihenfolge: letzter DB-Stand auf der Platte, Pool-Konfiguration aus dem Sheet, Standard-Pools
+    """
+    entry = snapshot_store.load("pools") if DATABASE_URL else None
+    if entry is not None:
+        value, fetched_at = entry
+        return value["pools"], "snapshot", round(time.time() - fetched_at, 1)
+    sheet_pools = sheet_refresher.value("pool_config")
+    if sheet_pools:
+        return sheet_pools, "sheet", snapshot_age("pool_config")
+    return get_default_pools(), "default", None
 
 @app.route('/api/pools', methods=['GET'])
 def get_pools():
-    """Lädt Pool-Konfiguration aus PostgreSQL Datenbank"""
+    """Lädt Pool-Konfiguration aus dem Snapshot des Workers (bzw. PostgreSQL Datenbank)"""
     try:
-        print(f"📥 Lade Pool-Konfiguration aus Datenbank...")
-        
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT name, start_time as start, deadline, factor, rate, use_rotation as "useRotation"
-                    FROM pools
-                    ORDER BY id
-                """)
-                pools = cur.fetchall()
-        
-        # Konvertiere zu Liste von Dicts (für JSON)
-        pools_list = [dict(pool) for pool in pools]
-        
-        print(f"✅ {len(pools_list)} Pools aus Datenbank geladen")
-        return jsonify(pools_list)
+        snapshot = pool_cache.get() if pool_cache else build_pools_snapshot()
+        return snapshot.body.response(snapshot.etag)
         
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Pools aus Datenbank: {e}")
-        import traceback
-        traceback.print_exc()
-        # Fallback zu Standard-Pools
-        return jsonify(get_default_pools())
+        log.exception("❌ Fehler beim Laden der Pools aus Datenbank", error=str(e))
+        # Fallback: letzter DB-Stand (Snapshot), sonst Google Sheets, sonst Standard-Pools
+        pools, _, age = fallback_pools()
+        return with_snapshot_age(jsonify(pools), age)
 
 @app.route('/api/pools/save', methods=['POST'])
 @app.route('/api/pools/save-to-sheets', methods=['POST'])  # Backward compatibility
 def save_pools():
-    """Speichert Pool-Konfiguration in PostgreSQL Datenbank (ersetzt alle Pools)"""
+    """
+    Speichert Pool-Konfiguration in PostgreSQL Datenbank (ersetzt alle Pools)
+    
+    - Schreibt nur Zeilen, die sich gegenüber der DB geändert haben (ein Multi-Row-UPSERT)
+    - Optimistic Locking: Header If-Match mit dem ETag aus GET /api/pools,
+      bei veraltetem Stand -> 412
+    """
     try:
         pools = request.get_json()
         
         if not pools or not isinstance(pools, list):
             return jsonify({"error": "Ungültige Pool-Daten"}), 400
         
-        print(f"📝 Speichere {len(pools)} Pools in Datenbank (ersetzt alle)...")
+        if_match = request.headers.get('If-Match')
+        if if_match and if_match.startswith('W/'):
+            if_match = if_match[2:]  # komprimierte Antworten tragen ein schwaches ETag
+        
+        # Gewünschter Zustand: Name -> (Werte, normalisierte Zeile); doppelte Namen: letzter gewinnt
+        submitted = {}
+        try:
+            for pool in pools:
+                if not isinstance(pool, dict) or not pool.get('name'):
+                    continue
+                values = (
+                    pool['name'],
+                    pool.get('start'),
+                    pool.get('deadline'),
+                    pool.get('factor', 1.0),
+                    pool.get('rate', 80),
+                    pool.get('useRotation', False)
+                )
+                submitted[pool['name']] = (values, pool_row_key(*values))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Ungültige Pool-Daten: {e}"}), 400
         
-        with get_db_connection() as conn:
+        with get_db_connection("pools_save") as conn:
             with conn.cursor() as cur:
-                # Sammle Pool-Namen aus der submitted Liste
-                pool_names = [pool.get('name') for pool in pools if pool.get('name')]
+                # Lock + aktueller Stand in einem Round-Trip
+                cur.execute("""
+                    SELECT pg_advisory_xact_lock(%s);
+                    SELECT name, start_time, deadline, factor, rate, use_rotation
+                    FROM pools
+                    ORDER BY id
+                """, (POOLS_SAVE_LOCK_ID,))
+                stored = [pool_row_key(*row) for row in cur.fetchall()]
                 
-                # Lösche alle Pools, die NICHT in der submitted Liste sind
-                if pool_names:
-                    placeholders = ','.join(['%s'] * len(pool_names))
-                    cur.execute(f"""
-                        DELETE FROM pools 
-                        WHERE name NOT IN ({placeholders})
-                    """, pool_names)
-                    deleted_count = cur.rowcount
-                    if deleted_count > 0:
-                        print(f"🗑️ {deleted_count} Pools aus Datenbank gelöscht (nicht mehr in Liste)")
-                else:
-                    # Wenn keine Pools submitted, lösche alle
-                    cur.execute("DELETE FROM pools")
-                    print("🗑️ Alle Pools aus Datenbank gelöscht")
+                current_etag = pools_etag(stored)
+                if if_match and if_match != '*' and if_match != current_etag:
+                    log.warning("⚠️ Pool-Speichern abgelehnt: veralteter Stand", if_match=if_match, etag=current_etag)
+                    return jsonify({
+                        "error": "Pool-Konfiguration wurde zwischenzeitlich geändert",
+                        "etag": current_etag
+                    }), 412
+                
+                stored_by_name = {row[0]: row for row in stored}
+                
+                # Pools, die NICHT mehr in der Liste sind
+                stale_names = [name for name in stored_by_name if name not in submitted]
                 
-                # Füge/Update alle submitted Pools
-                for pool in pools:
-                    # UPDATE oder INSERT (UPSERT)
-                    cur.execute("""
+                # Nur neue oder geänderte Pools schreiben
+                upserts = [
+                    values for name, (values, key) in submitted.items()
+                    if stored_by_name.get(name) != key
+                ]
+                
+                if stale_names:
+                    cur.execute("DELETE FROM pools WHERE name = ANY(%s)", (stale_names,))
+                    log.info("🗑️ Pools aus Datenbank gelöscht (nicht mehr in Liste)", count=cur.rowcount)
+                
+                if upserts:
+                    execute_values(cur, """
                         INSERT INTO pools (name, start_time, deadline, factor, rate, use_rotation, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                        VALUES %s
                         ON CONFLICT (name) 
                         DO UPDATE SET 
                             start_time = EXCLUDED.start_time,
@@ -290,132 +667,241 @@ def save_pools():
                             rate = EXCLUDED.rate,
                             use_rotation = EXCLUDED.use_rotation,
                             updated_at = CURRENT_TIMESTAMP
-                    """, (
-                        pool.get('name'),
-                        pool.get('start'),
-                        pool.get('deadline'),
-                        pool.get('factor', 1.0),
-                        pool.get('rate', 80),
-                        pool.get('useRotation', False)
-                    ))
+                    """, upserts,
+                        template="(%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)",
+                        page_size=max(len(upserts), 1))
+                
+                if stale_names or upserts:
+                    # NOTIFY wird beim Commit an alle Worker zugestellt (Pool-Cache verwerfen);
+                    # neuer Stand so, wie ihn die Spalten speichern (z.B. gerundetes rate/factor
+                    # bei älteren Tabellen), damit das ETag zum nächsten GET passt
+                    cur.execute(f"""
+                        NOTIFY {POOLS_CHANNEL};
+                        SELECT name, start_time, deadline, factor, rate, use_rotation
+                        FROM pools
+                        ORDER BY id
+                    """)
+                    stored = [pool_row_key(*row) for row in cur.fetchall()]
+        
+        if pool_cache and (stale_names or upserts):
+            pool_cache.invalidate()  # eigener Worker sofort, nicht erst über LISTEN
+        
+        new_etag = pools_etag(stored)
         
-        print(f"✅ {len(pools)} Pools erfolgreich in Datenbank gespeichert")
-        return jsonify({"success": True, "message": "Pools in Datenbank gespeichert"})
+        log.info("✅ Pools gespeichert", changed=len(upserts), deleted=len(stale_names),
+                 unchanged=len(submitted) - len(upserts))
+        response = jsonify({
+            "success": True,
+            "message": "Pools in Datenbank gespeichert",
+            "etag": new_etag,
+            "changed": len(upserts),
+            "deleted": len(stale_names),
+            "unchanged": len(submitted) - len(upserts)
+        })
+        response.headers['ETag'] = new_etag
+        return response
             
     except ValueError as ve:
-        print(f"❌ Konfigurationsfehler: {ve}")
+        log.error("❌ Konfigurationsfehler", error=str(ve))
         return jsonify({"error": "DATABASE_URL nicht konfiguriert"}), 500
     except Exception as e:
-        print(f"❌ Fehler beim Speichern in Datenbank: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Fehler beim Speichern in Datenbank", error=str(e))
         return jsonify({"error": str(e)}), 500
 
+def read_mitarbeiter_from_db(date):
+    """Gespeicherte Mitarbeiter-Zahlen für ein Datum oder None"""
+    with get_db_connection("mitarbeiter_read") as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT frueh as "maFrueh", spat as "maSpat", taeti as "maTäti"
+                FROM mitarbeiter
+                WHERE date = %s
+            """, (date,))
+            result = cur.fetchone()
+    return dict(result) if result else None
+
+# Write-Behind für POST /api/mitarbeiter/save: pro Datum gewinnt der neueste Wert,
+# geschrieben wird gebündelt in einer Transaktion (siehe write_behind.py)
+MITARBEITER_FLUSH_SECONDS = float(os.getenv("MITARBEITER_FLUSH_SECONDS", "0.5"))
+MITARBEITER_FLUSH_MAX = int(os.getenv("MITARBEITER_FLUSH_MAX", "200"))
+MITARBEITER_SYNC_TIMEOUT = float(os.getenv("MITARBEITER_SYNC_TIMEOUT", "10"))
+MITARBEITER_MAX_COUNT = 100000  # Plausibilitätsgrenze pro Schicht (Spalten sind INTEGER)
+
+def flush_mitarbeiter(entries):
+    """Schreibt [(datum, (früh, spät, täti), zeitstempel), ...] in einer Transaktion"""
+    rows = [
+        (date, frueh, spat, taeti, datetime.datetime.fromtimestamp(ts, datetime.timezone.utc))
+        for date, (frueh, spat, taeti), ts in entries
+    ]
+    with get_db_connection("mitarbeiter_flush") as conn:
+        with conn.cursor() as cur:
+            # Ältere Werte (z.B. aus einem anderen Worker) überschreiben keine neueren
+            execute_values(cur, """
+                INSERT INTO mitarbeiter (date, frueh, spat, taeti, updated_at)
+                VALUES %s
+                ON CONFLICT (date)
+                DO UPDATE SET
+                    frueh = EXCLUDED.frueh,
+                    spat = EXCLUDED.spat,
+                    taeti = EXCLUDED.taeti,
+                    updated_at = EXCLUDED.updated_at
+                WHERE mitarbeiter.updated_at IS NULL OR mitarbeiter.updated_at <= EXCLUDED.updated_at
+            """, rows, template="(%s::date, %s, %s, %s, %s::timestamptz)", page_size=1000)
+
+mitarbeiter_writes = WriteBehindQueue(
+    flush_mitarbeiter, interval=MITARBEITER_FLUSH_SECONDS, max_pending=MITARBEITER_FLUSH_MAX,
+    # Ungültige Werte: Wiederholen hilft nicht, nur die betroffene Zeile wird verworfen
+    permanent_errors=(psycopg2.DataError, psycopg2.IntegrityError)
+) if DATABASE_URL else None
+
+def pending_mitarbeiter(date):
+    """Gespeicherter, aber noch nicht geschriebener Wert für ein Datum (read-your-writes) oder None"""
+    if mitarbeiter_writes is None:
+        return None
+    try:
+        key = datetime.date.fromisoformat(date).isoformat()
+    except (TypeError, ValueError):
+        return None
+    counts = mitarbeiter_writes.pending(key)
+    if counts is None:
+        return None
+    return {"maFrueh": counts[0], "maSpat": counts[1], "maTäti": counts[2]}
+
+def lookup_mitarbeiter(date, roster_timeout=0):
+    """
+    Mitarbeiter-Zahlen für ein Datum: zuerst Datenbank, sonst Mitarbeiter-Sheet, sonst 0/0/0.
+    roster_timeout: so lange auf den ersten Abruf des Sheets warten (Kaltstart des Workers).
+    Bei DB-Fehlern wird das Sheet (bzw. dessen Snapshot) verwendet; ist das Datum dort nicht
+    vorhanden, wird der DB-Fehler an den Aufrufer weitergegeben.
+    """
+    # Prüfe zuerst noch nicht geschriebene Änderungen, dann die Datenbank
+    db_error = None
+    try:
+        data = pending_mitarbeiter(date) or read_mitarbeiter_from_db(date)
+    except Exception as e:
+        log.warning("⚠️ Mitarbeiter nicht aus Datenbank ladbar, verwende Sheet", date=date, error=str(e))
+        data, db_error = None, e
+    
+    if data:
+        log.info("✅ Mitarbeiter aus Datenbank", date=date, frueh=data['maFrueh'], spat=data['maSpat'],
+                 taeti=data['maTäti'], sample=True)
+        return data
+    
+    # Fallback: Index über das Mitarbeiter-Sheet (vom Refresher bei jedem Abruf zeilenweise neu geparst)
+    if date_key(date) is None:
+        log.warning("⚠️ Ungültiges Datumsformat", date=date)
+        return {"maFrueh": 0, "maSpat": 0, "maTäti": 0}
+    
+    roster = sheet_refresher.wait("mitarbeiter", roster_timeout) if roster_timeout else get_roster_index()
+    age = snapshot_age("mitarbeiter")
+    
+    counts = roster.lookup(date) if roster is not None else None
+    if counts is None and db_error is not None:
+        raise db_error
+    
+    if roster is None:
+        log.warning("⚠️ Mitarbeiter-Sheet (noch) nicht geladen, verwende 0/0/0", date=date)
+        return {"maFrueh": 0, "maSpat": 0, "maTäti": 0}
+    
+    if counts is None:
+        log.info("⚠️ Datum nicht im Sheet gefunden", date=date, sample=True)
+        return {"maFrueh": 0, "maSpat": 0, "maTäti": 0}
+    
+    count_frueh, count_spat, count_täti = counts
+    log.info("✅ Mitarbeiter aus Sheet", date=date, frueh=count_frueh, spat=count_spat,
+             taeti=count_täti, snapshot_age=age, sample=True)
+    
+    data = {
+        "maFrueh": count_frueh,
+        "maSpat": count_spat,
+        "maTäti": count_täti
+    }
+    if age is not None:
+        data["snapshotAge"] = age  # Sheet seit dem Start nicht erreichbar: Stand aus dem Snapshot
+    return data
+
 @app.route('/api/mitarbeiter/<date>', methods=['GET'])
 def get_mitarbeiter(date):
     """Lädt Mitarbeiter-Daten für ein bestimmtes Datum aus PostgreSQL Datenbank"""
     try:
-        # Prüfe zuerst die Datenbank
-        with get_db_connection() as conn:
+        data = lookup_mitarbeiter(date)
+        return with_snapshot_age(jsonify(data), data.get("snapshotAge"))
+        
+    except Exception as e:
+        log.error("❌ Fehler beim Laden der Mitarbeiter-Daten", date=date, error=str(e))
+        return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
+
+MITARBEITER_RANGE_MAX_DAYS = 366
+
+@app.route('/api/mitarbeiter/range', methods=['GET'])
+def get_mitarbeiter_range():
+    """Lädt Mitarbeiter-Daten für einen Datumsbereich (?from=YYYY-MM-DD&to=YYYY-MM-DD) in einer Antwort"""
+    try:
+        date_from = datetime.date.fromisoformat(request.args.get('from', ''))
+        date_to = datetime.date.fromisoformat(request.args.get('to', ''))
+    except ValueError:
+        return jsonify({"error": "Parameter 'from' und 'to' im Format YYYY-MM-DD erforderlich"}), 400
+    
+    if date_to < date_from:
+        return jsonify({"error": "'to' liegt vor 'from'"}), 400
+    
+    days = (date_to - date_from).days + 1
+    if days > MITARBEITER_RANGE_MAX_DAYS:
+        return jsonify({"error": f"Maximal {MITARBEITER_RANGE_MAX_DAYS} Tage pro Anfrage"}), 400
+    
+    dates = [(date_from + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    
+    # Datenbank hat Vorrang (ein Query für den ganzen Bereich)
+    db_rows = {}
+    try:
+        with get_db_connection("mitarbeiter_range") as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute("""
-                    SELECT frueh as "maFrueh", spat as "maSpat", taeti as "maTäti"
+                    SELECT date, frueh as "maFrueh", spat as "maSpat", taeti as "maTäti"
                     FROM mitarbeiter
-                    WHERE date = %s
-                """, (date,))
-                result = cur.fetchone()
-        
-        if result:
-            data = dict(result)
-            print(f"✅ Mitarbeiter für {date} aus Datenbank: FRÜH={data['maFrueh']}, SPÄT={data['maSpat']}, Täti={data['maTäti']}")
-            return jsonify(data)
-        
-        # Fallback: Versuche aus Google Sheets zu laden
-        print(f"📥 Lade Mitarbeiter-Daten für {date} aus Google Sheets...")
-        
-        csv_text = fetch_google_sheet_csv(MITARBEITER_SHEET_ID, gid="0")
-        
-        if not csv_text:
-            print("⚠️ Mitarbeiter-Sheet nicht erreichbar, verwende 0/0/0")
-            return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
-        
-        # Parse CSV
-        csv_file = StringIO(csv_text)
-        reader = csv.reader(csv_file)
-        lines = list(reader)
-        
-        if len(lines) < 6:
-            print("⚠️ Mitarbeiter-Sheet hat zu wenige Zeilen")
-            return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
-        
-        # Finde die Spalte für das Datum
-        date_parts = date.split('-')
-        if len(date_parts) == 3:
-            day = date_parts[2].lstrip('0')
-            month = date_parts[1].lstrip('0')
-            search_date = f"{day}.{month}."
-        else:
-            print(f"⚠️ Ungültiges Datumsformat: {date}")
-            return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
-        
-        date_row = lines[3] if len(lines) > 3 else []
-        col_index = -1
-        
-        for i, cell in enumerate(date_row):
-            if search_date in str(cell):
-                col_index = i
-                break
-        
-        if col_index == -1:
-            print(f"⚠️ Datum {search_date} nicht im Sheet gefunden")
-            return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
-        
-        # Zähle Schichten
-        count_frueh = 0
-        count_spat = 0
-        count_täti = 0
-        
-        for row_idx in range(4, len(lines)):
-            row = lines[row_idx]
-            mitarbeiter = row[0].strip() if len(row) > 0 else ""
-            if not mitarbeiter:
-                continue
-            
-            if col_index >= len(row):
-                continue
-                
-            schicht_code = row[col_index].strip().upper()
-            
-            if not schicht_code or schicht_code == '-' or schicht_code == '':
-                continue
-            
-            schicht_code = ''.join([c for c in schicht_code if not c.isdigit()]).strip()
-            
-            if schicht_code in ['FT', 'A', 'U', 'K', 'URD', 'KA']:
-                continue
-            
-            if 'FRÜH' in schicht_code or 'FRUEH' in schicht_code:
-                count_frueh += 1
-            elif 'SPÄT' in schicht_code or 'SPAT' in schicht_code:
-                count_spat += 1
-            elif 'TÄTI' in schicht_code or schicht_code == 'ROT':
-                count_täti += 1
-        
-        print(f"✅ Mitarbeiter für {date}: FRÜH={count_frueh}, SPÄT={count_spat}, Täti={count_täti}")
-        
-        return jsonify({
-            "maFrueh": count_frueh,
-            "maSpat": count_spat,
-            "maTäti": count_täti
-        })
-        
+                    WHERE date BETWEEN %s AND %s
+                """, (dates[0], dates[-1]))
+                for row in cur.fetchall():
+                    row = dict(row)
+                    db_rows[str(row.pop('date'))] = row
     except Exception as e:
-        print(f"❌ Fehler beim Laden der Mitarbeiter-Daten: {e}")
-        return jsonify({"maFrueh": 0, "maSpat": 0, "maTäti": 0})
+        log.warning("⚠️ Mitarbeiter-Bereich nicht aus Datenbank ladbar", error=str(e))
+    
+    # Noch nicht geschriebene Änderungen (Write-Behind) sind neuer als die Datenbank
+    if mitarbeiter_writes is not None:
+        for date in dates:
+            pending = pending_mitarbeiter(date)
+            if pending is not None:
+                db_rows[date] = pending
+    
+    roster = get_roster_index() if len(db_rows) < len(dates) else None
+    
+    result = {}
+    for date in dates:
+        if date in db_rows:
+            result[date] = {**db_rows[date], "source": "db"}
+            continue
+        counts = roster.lookup(date) if roster else None
+        if counts is not None:
+            result[date] = {"maFrueh": counts[0], "maSpat": counts[1], "maTäti": counts[2], "source": "sheet"}
+        else:
+            result[date] = {"maFrueh": 0, "maSpat": 0, "maTäti": 0, "source": "none"}
+    
+    log.info("✅ Mitarbeiter-Bereich geladen", date_from=dates[0], date_to=dates[-1],
+             db=len(db_rows), sheet=len(dates) - len(db_rows), sample=True)
+    return jsonify({"from": dates[0], "to": dates[-1], "days": result})
 
 @app.route('/api/mitarbeiter/save', methods=['POST'])
 def save_mitarbeiter():
-    """Speichert Mitarbeiter-Daten in PostgreSQL Datenbank"""
+    """
+    Speichert Mitarbeiter-Daten in PostgreSQL Datenbank (gepuffert, siehe write_behind.py)
+    
+    Antwort: seq (Sequenznummer dieses Schreibzugriffs) und durableSeq (bis hierhin gespeichert).
+    Mit "sync": true (oder ?sync=1) wird sofort geschrieben und erst danach geantwortet.
+    Schlägt das synchrone Schreiben fehl, kommt 500 mit "queued": true, wenn der Wert noch im
+    Puffer ist und weiter versucht wird (DB nicht erreichbar, Timeout), bzw. "queued": false,
+    wenn die Datenbank ihn abgelehnt und er verworfen wurde.
+    """
     try:
         data = request.get_json()
         
@@ -423,44 +909,716 @@ def save_mitarbeiter():
             return jsonify({"error": "Ungültige Daten"}), 400
         
         date = data.get('date') or data.get('datum')
-        ma_frueh = data.get('maFrueh', 0)
-        ma_spat = data.get('maSpat', 0)
-        ma_täti = data.get('maTäti', 0)
+        try:
+            date = datetime.date.fromisoformat(date).isoformat()
+            counts = tuple(int(data.get(key) or 0) for key in ('maFrueh', 'maSpat', 'maTäti'))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({"error": "Ungültige Daten (date: YYYY-MM-DD, Zahlen für maFrueh/maSpat/maTäti)"}), 400
+        if not all(0 <= count <= MITARBEITER_MAX_COUNT for count in counts):
+            return jsonify({"error": f"maFrueh/maSpat/maTäti müssen zwischen 0 und {MITARBEITER_MAX_COUNT} liegen"}), 400
         
-        # Speichere in Datenbank (UPSERT)
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO mitarbeiter (date, frueh, spat, taeti, updated_at)
-                    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    ON CONFLICT (date)
-                    DO UPDATE SET
-                        frueh = EXCLUDED.frueh,
-                        spat = EXCLUDED.spat,
-                        taeti = EXCLUDED.taeti,
-                        updated_at = CURRENT_TIMESTAMP
-                """, (date, ma_frueh, ma_spat, ma_täti))
+        if mitarbeiter_writes is None:
+            return jsonify({"error": "DATABASE_URL nicht konfiguriert"}), 500
+        
+        seq = mitarbeiter_writes.submit(date, counts)
+        sync = data.get('sync') is True or request.args.get('sync') in ('1', 'true')
         
-        print(f"💾 Mitarbeiter in DB gespeichert für {date}: FRÜH={ma_frueh}, SPÄT={ma_spat}, Täti={ma_täti}")
+        if sync and not mitarbeiter_writes.wait_durable(seq, MITARBEITER_SYNC_TIMEOUT):
+            rejected = mitarbeiter_writes.rejected(seq)
+            error = rejected or mitarbeiter_writes.last_error or "Timeout beim Speichern"
+            log.error("❌ Fehler beim Speichern der Mitarbeiter-Daten", date=date, error=error,
+                      queued=rejected is None)
+            return jsonify({"error": error, "seq": seq, "durableSeq": mitarbeiter_writes.durable_seq,
+                            "queued": rejected is None}), 500
         
-        return jsonify({"success": True})
+        log.info("💾 Mitarbeiter gespeichert", date=date, frueh=counts[0], spat=counts[1],
+                 taeti=counts[2], sync=sync, sample=True)
+        
+        durable_seq = mitarbeiter_writes.durable_seq
+        return jsonify({
+            "success": True,
+            "seq": seq,
+            "durableSeq": durable_seq,
+            "durable": durable_seq >= seq
+        })
         
     except Exception as e:
-        print(f"❌ Fehler beim Speichern der Mitarbeiter-Daten: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Fehler beim Speichern der Mitarbeiter-Daten", error=str(e))
         return jsonify({"error": str(e)}), 500
 
+ALLOCATION_MAX_SCENARIOS = int(os.getenv("ALLOCATION_MAX_SCENARIOS", "5000"))
+
+@app.route('/api/allocation', methods=['POST'])
+def compute_allocation():
+    """
+    Berechnet Bedarf und Zuteilung (FRÜH/SPÄT/Täti) für einen Batch von Szenarien
+    
+    Body: {
+        "pools": [...],            # optional, sonst Pool-Konfiguration aus der Datenbank
+        "volumes": {name: vol},    # optional, Live-Vol je Pool
+        "scenarios": [{"maFrueh": 20, "maSpat": 10, "maTäti": 4, ...}, ...],
+        "detail": true             # false = nur Summen je Szenario
+    }
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Ungültige Daten"}), 400
+    
+    scenarios = data.get('scenarios')
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+    if not isinstance(scenarios, list) or not scenarios or not all(isinstance(sc, dict) for sc in scenarios):
+        return jsonify({"error": "Mindestens ein Szenario erforderlich"}), 400
+    if len(scenarios) > ALLOCATION_MAX_SCENARIOS:
+        return jsonify({"error": f"Maximal {ALLOCATION_MAX_SCENARIOS} Szenarien pro Anfrage"}), 400
+    
+    pools = data.get('pools')
+    if pools is None:
+        pools = pools_with_fallback()
+    if not isinstance(pools, list) or not all(isinstance(p, dict) for p in pools):
+        return jsonify({"error": "Ungültige Pool-Daten"}), 400
+    
+    volumes = data.get('volumes')
+    if isinstance(volumes, dict):
+        pools = [{**p, "liveVol": volumes.get(p.get('name'), p.get('liveVol', 0))} for p in pools]
+    
+    started = time.perf_counter()
+    try:
+        results = allocation.evaluate(pools, scenarios, detail=data.get('detail', True) is not False)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Ungültige Szenario-Daten: {e}"}), 400
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    log.info("🧮 Zuteilung berechnet", scenarios=len(scenarios), pools=len(pools),
+             elapsed_ms=round(elapsed_ms, 1), sample=True)
+    return jsonify({
+        "scenarios": results,
+        "pools": len(pools),
+        "elapsedMs": round(elapsed_ms, 2)
+    })
+
+# ========== SIMULATION ==========
+# Zeitschritt-Simulation des restlichen Tages (simulator.py): wann wird welcher Pool fertig?
+
+SIMULATION_SLOT_MINUTES = int(os.getenv("SIMULATION_SLOT_MINUTES", "15"))
+SIMULATION_MAX_SCENARIOS = int(os.getenv("SIMULATION_MAX_SCENARIOS", "200"))
+simulator = Simulator()
+
+def now_hours():
+    """Aktuelle Uhrzeit am Standort in Stunden (9:30 -> 9.5)"""
+    now = datetime.datetime.now(APP_TIMEZONE)
+    return now.hour + now.minute / 60 + now.second / 3600
+
+def staffing_for(date):
+    """
+    Besetzung für ein Datum ohne Schreibzugriff, gleiche Reihenfolge wie lookup_mitarbeiter:
+    gepufferter Wert/DB, sonst Mitarbeiter-Sheet, sonst None
+    """
+    if DATABASE_URL:
+        try:
+            data = pending_mitarbeiter(date) or read_mitarbeiter_from_db(date)
+        except Exception as e:
+            log.warning("⚠️ Mitarbeiter nicht aus Datenbank ladbar, verwende Sheet", date=date, error=str(e))
+            data = None
+        if data:
+            return data
+    roster = get_roster_index()
+    counts = roster.lookup(date) if roster else None
+    if counts is None:
+        return None
+    return {"maFrueh": counts[0], "maSpat": counts[1], "maTäti": counts[2]}
+
+def pools_with_fallback():
+    """Pool-Konfiguration aus DB/Snapshot, sonst aus dem Sheet, sonst Standard-Pools"""
+    if not DATABASE_URL:
+        return sheet_refresher.value("pool_config") or get_default_pools()
+    try:
+        return current_pools()
+    except Exception as e:
+        log.warning("⚠️ Pools nicht aus Datenbank ladbar, verwende Snapshot, Sheet bzw. Standard-Pools",
+                    error=str(e))
+        return fallback_pools()[0]
+
+@app.route('/api/simulate', methods=['GET', 'POST'])
+def simulate_day():
+    """
+    Projektion pro Pool: voraussichtliche Fertigstellung, Puffer und Deadline-Risiko
+    
+    GET ?now=HH:MM&slotMinutes=15 mit Pools, Live-Vol und Besetzung von heute, oder POST {
+        "pools": [...],              # optional, sonst Pool-Konfiguration
+        "volumes": {name: vol},      # optional, sonst aktuelle Live-Vol
+        "scenarios": [{"maFrueh": 20, "maSpat": 10, "maTäti": 4}, ...],  # optional, sonst Besetzung heute
+        "now": "09:30",              # optional, sonst aktuelle Uhrzeit
+        "slotMinutes": 15            # 5, 10, 15, 30 oder 60
+    }
+    """
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Ungültige Daten"}), 400
+    
+    try:
+        slot_minutes = int(data.get('slotMinutes') or request.args.get('slotMinutes') or SIMULATION_SLOT_MINUTES)
+    except (TypeError, ValueError):
+        slot_minutes = None
+    if slot_minutes not in SIMULATION_SLOTS:
+        return jsonify({"error": f"slotMinutes: {', '.join(map(str, SIMULATION_SLOTS))}"}), 400
+    
+    now_arg = data.get('now') or request.args.get('now')
+    if now_arg is not None:
+        match = re.fullmatch(r'(\d{1,2}):(\d{2})', str(now_arg))
+        if not match or int(match[1]) > 23 or int(match[2]) > 59:
+            return jsonify({"error": "Parameter 'now' im Format HH:MM (00:00 bis 23:59)"}), 400
+    now = allocation.to_hours(now_arg) if now_arg else now_hours()
+    
+    scenarios = data.get('scenarios')
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+    if scenarios is None:
+        try:
+            scenarios = [staffing_for(today_string()) or {}]
+        except Exception as e:
+            log.warning("⚠️ Besetzung für heute nicht ladbar", error=str(e))
+            scenarios = [{}]
+    if not isinstance(scenarios, list) or not scenarios or not all(isinstance(sc, dict) for sc in scenarios):
+        return jsonify({"error": "Mindestens ein Szenario erforderlich"}), 400
+    if len(scenarios) > SIMULATION_MAX_SCENARIOS:
+        return jsonify({"error": f"Maximal {SIMULATION_MAX_SCENARIOS} Szenarien pro Anfrage"}), 400
+    
+    pools = data.get('pools')
+    if pools is None:
+        pools = pools_with_fallback()
+    if not isinstance(pools, list) or not all(isinstance(p, dict) for p in pools):
+        return jsonify({"error": "Ungültige Pool-Daten"}), 400
+    
+    volumes = data.get('volumes')
+    if volumes is None:
+        volumes = sheet_refresher.value("livevol") or {}
+    if not isinstance(volumes, dict):
+        return jsonify({"error": "volumes: {Poolname: Volumen}"}), 400
+    
+    started = time.perf_counter()
+    try:
+        results = simulator.run(pools, volumes, scenarios, now, slot_minutes)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Ungültige Simulationsdaten: {e}"}), 400
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    log.info("⏱️ Simulation berechnet", scenarios=len(scenarios), pools=len(pools),
+             slot_minutes=slot_minutes, elapsed_ms=round(elapsed_ms, 1), sample=True)
+    return jsonify({
+        "now": format_time(now),
+        "slotMinutes": slot_minutes,
+        "scenarios": results,
+        "elapsedMs": round(elapsed_ms, 2)
+    })
+
+# ========== END SIMULATION ==========
+
 # API-Endpunkt für Google Sheets Config (sicher für Frontend!)
+def sheets_config():
+    return {
+        "liveVolSheetId": LIVE_VOL_SHEET_ID,
+        "poolConfigSheetId": GOOGLE_SHEETS_ID,
+        "mitarbeiterSheetId": MITARBEITER_SHEET_ID
+    }
+
 @app.route('/api/config/sheets', methods=['GET'])
 def get_sheets_config():
     """Liefert Google Sheets IDs sicher vom Backend"""
+    return jsonify(sheets_config())
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Monitoring: Hintergrund-Refresher, DB-Pool, Live-Stream und Write-Behind"""
     return jsonify({
-        "liveVolSheetId": LIVE_VOL_SHEET_ID,
-        "poolConfigSheetId": GOOGLE_SHEETS_ID,
-        "mitarbeiterSheetId": MITARBEITER_SHEET_ID
+        "dbPool": db_pool.stats() if db_pool else None,
+        "stream": stream_hub.stats(),
+        "refresher": sheet_refresher.stats(),
+        "livevolStore": livevol_store.stats() if livevol_store else None,
+        "poolCache": pool_cache.stats() if pool_cache else None,
+        "simulator": simulator.stats(),
+        "mitarbeiterWrites": mitarbeiter_writes.stats() if mitarbeiter_writes else None,
+        "snapshotStore": snapshot_store.stats(),
+        "schema": schema_migrator.stats() if schema_migrator else None,
+        "exports": {**export_counts, "max": EXPORT_MAX_CONCURRENT}
     })
 
+# Zähler des Refreshers, des DB-Pools und der Write-Behind-Queue werden erst beim Abruf von /metrics gelesen
+metrics_registry.counter_callback(
+    "sheet_refresher_fetches_total", "Abrufe des Hintergrund-Refreshers pro Sheet nach Ergebnis", ("sheet", "result"),
+    lambda: {(name, result): job[key] for name, job in sheet_refresher.stats().items()
+             for result, key in (("attempt", "fetches"), ("failure", "failures"), ("parsed", "parses"))})
+metrics_registry.gauge_callback(
+    "db_pool_connections", "Verbindungen im DB-Pool nach Zustand", ("state",),
+    lambda: {state: db_pool.stats()[key] for state, key in
+             (("idle", "idle"), ("in_use", "inUse"), ("waiting", "waiting"))} if db_pool else {})
+metrics_registry.counter_callback(
+    "db_pool_events_total", "Ereignisse im DB-Pool", ("event",),
+    lambda: {event: db_pool.stats()[key] for event, key in
+             (("created", "created"), ("discarded", "discarded"), ("ping_failure", "pingFailures"),
+              ("timeout", "timeouts"))} if db_pool else {})
+metrics_registry.gauge_callback(
+    "sheet_refresher_age_seconds", "Alter des zuletzt erfolgreich geladenen Sheets", ("sheet",),
+    lambda: {name: sheet_refresher.age(name) for name in sheet_refresher.stats()})
+metrics_registry.gauge_callback(
+    "sheet_refresher_breaker_open", "1, wenn der Circuit-Breaker eines Sheets offen ist", ("sheet",),
+    lambda: {name: int(job["breaker"] == "open") for name, job in sheet_refresher.stats().items()})
+metrics_registry.counter_callback(
+    "sheet_refresher_parses_total", "Neu geparste Sheet-Stände (CSV hat sich geändert)", ("sheet",),
+    lambda: {name: job["parses"] for name, job in sheet_refresher.stats().items()})
+metrics_registry.counter_callback(
+    "pool_cache_requests_total", "Zugriffe auf den Pool-Snapshot nach Ergebnis", ("result",),
+    lambda: {"hit": pool_cache.hits, "load": pool_cache.loads, "bypass": pool_cache.bypasses}
+    if pool_cache else {})
+metrics_registry.gauge_callback(
+    "pool_cache_listening", "1, wenn die LISTEN-Verbindung des Pool-Caches steht", (),
+    lambda: {(): int(pool_cache.stats()["listening"])} if pool_cache else {})
+metrics_registry.counter_callback(
+    "mitarbeiter_write_behind_total", "Write-Behind für Mitarbeiter-Saves nach Ereignis", ("event",),
+    lambda: {event: mitarbeiter_writes.stats()[key] for event, key in
+             (("submitted", "submitted"), ("coalesced", "coalesced"), ("flush", "flushes"),
+              ("row_written", "rowsWritten"), ("failure", "failures"), ("rejected", "rejected"))} if mitarbeiter_writes else {})
+metrics_registry.gauge_callback(
+    "mitarbeiter_write_behind_pending", "Gepufferte, noch nicht geschriebene Mitarbeiter-Werte", (),
+    lambda: {(): mitarbeiter_writes.stats()["pending"]} if mitarbeiter_writes else {})
+metrics_registry.gauge_callback(
+    "stream_subscribers", "Offene /api/stream Verbindungen", (),
+    lambda: {(): stream_hub.stats()["subscribers"]})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus-Metriken dieses Workers (Latenzen, Google-Abrufe, DB, Caches)"""
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
+
+# ========== LIVE-STREAM (Server-Sent Events) ==========
+# Ein Poller pro Prozess liest die Quellen; alle Dashboards abonnieren /api/stream
+
+APP_TIMEZONE = ZoneInfo(os.getenv("APP_TIMEZONE", "Europe/Berlin"))
+STREAM_LIVEVOL_INTERVAL = float(os.getenv("STREAM_LIVEVOL_INTERVAL", "1"))
+STREAM_MITARBEITER_INTERVAL = float(os.getenv("STREAM_MITARBEITER_INTERVAL", "5"))
+STREAM_POOLS_INTERVAL = float(os.getenv("STREAM_POOLS_INTERVAL", "30"))
+STREAM_PROJECTION_INTERVAL = float(os.getenv("STREAM_PROJECTION_INTERVAL", "5"))  # 0 = keine Projektion
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+def today_string():
+    """Heutiges Datum (YYYY-MM-DD) in der Zeitzone des Standorts"""
+    return datetime.datetime.now(APP_TIMEZONE).date().isoformat()
+
+def stream_livevol():
+    return sheet_refresher.value("livevol")
+
+def stream_pools():
+    return current_pools()
+
+_stream_saved_mitarbeiter = None
+
+def stream_mitarbeiter():
+    """
+    Mitarbeiter für heute (Reihenfolge wie lookup_mitarbeiter: DB, sonst Sheet).
+    Ändert sich der Dienstplan im Sheet, wird er wie bisher beim Auto-Import im Frontend
+    gespeichert - über die Write-Behind-Queue, einmal pro Änderung und Prozess.
+    """
+    global _stream_saved_mitarbeiter
+    date = today_string()
+    roster = get_roster_index()
+    counts = roster.lookup(date) if roster else None
+    
+    if counts is not None and mitarbeiter_writes is not None and _stream_saved_mitarbeiter != (date, counts):
+        mitarbeiter_writes.submit(date, counts)
+        _stream_saved_mitarbeiter = (date, counts)
+    
+    data = staffing_for(date)
+    if data is None:
+        return None
+    return {"date": date, **data}
+
+def stream_projection():
+    """Projektion für heute bei aktueller Live-Vol und Besetzung (Simulation nur bei geänderten Eingaben)"""
+    volumes = sheet_refresher.value("livevol")
+    staffing = staffing_for(today_string())
+    if volumes is None or staffing is None:
+        return None
+    result = simulator.run(pools_with_fallback(), volumes, [staffing], now_hours(), SIMULATION_SLOT_MINUTES)[0]
+    return {
+        p["name"]: {"completion": p["completion"], "slackMinutes": p["slackMinutes"], "status": p["status"]}
+        for p in result["pools"]
+    }
+
+stream_hub = StreamHub(heartbeat=STREAM_HEARTBEAT)
+stream_hub.add_source("livevol", stream_livevol, STREAM_LIVEVOL_INTERVAL)
+stream_hub.add_source("mitarbeiter", stream_mitarbeiter, STREAM_MITARBEITER_INTERVAL)
+if DATABASE_URL:
+    stream_hub.add_source("pools", stream_pools, STREAM_POOLS_INTERVAL)
+if STREAM_PROJECTION_INTERVAL > 0:
+    stream_hub.add_source("projection", stream_projection, STREAM_PROJECTION_INTERVAL)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events: Live-Vol, Mitarbeiter und Pools (nur Änderungen)"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    response = Response(
+        stream_with_context(stream_hub.subscribe(last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ========== END LIVE-STREAM ==========
+
+# ========== LIVE-VOL HISTORIE ==========
+# Snapshots werden im Hintergrund in PostgreSQL aufgenommen (livevol_store.py),
+# Abfragen lesen nur vorab aggregierte Buckets
+
+LIVEVOL_RECORD_SECONDS = float(os.getenv("LIVEVOL_RECORD_SECONDS", "10"))  # 0 = keine Aufnahme
+LIVEVOL_HISTORY_MAX_POINTS = int(os.getenv("LIVEVOL_HISTORY_MAX_POINTS", "2000"))
+LIVEVOL_RESOLUTION_ALIASES = {"1m": 60, "15m": 900, "1h": 3600}
+
+def livevol_source():
+    return sheet_refresher.value("livevol"), sheet_refresher.age("livevol")
+
+livevol_store = LivevolStore(
+    get_db_connection,
+    livevol_source,
+    sample_seconds=LIVEVOL_RECORD_SECONDS,
+    # Nur frische Werte aufnehmen (Refresher hängt z.B. bei offenem Circuit-Breaker)
+    max_age=max(LIVEVOL_RECORD_SECONDS, 3 * REFRESH_LIVEVOL_SECONDS),
+) if DATABASE_URL and LIVEVOL_RECORD_SECONDS > 0 else None
+
+@app.before_request
+def start_livevol_recorder():
+    if livevol_store is not None:
+        livevol_store.ensure_running()
+
+def parse_history_time(value, default):
+    """ISO-Datum/-Zeit aus der Query; ohne Zeitzone gilt APP_TIMEZONE"""
+    if not value:
+        return default
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=APP_TIMEZONE)
+    return parsed
+
+@app.route('/api/livevol/history', methods=['GET'])
+def get_livevol_history():
+    """
+    Live-Vol Verlauf aus vorab aggregierten Buckets
+    
+    ?from=2025-10-06&to=2025-10-07   Bereich [from, to), Standard: letzte 24 Stunden
+    &resolution=auto|1m|15m|1h       Standard auto (feinste Auflösung mit <= LIVEVOL_HISTORY_MAX_POINTS Punkten)
+    &pool=NAME (mehrfach möglich)    Standard: alle Pools
+    """
+    if livevol_store is None:
+        return jsonify({"error": "Live-Vol Historie nicht aktiv (DATABASE_URL / LIVEVOL_RECORD_SECONDS)"}), 503
+    
+    now = datetime.datetime.now(APP_TIMEZONE)
+    try:
+        end = parse_history_time(request.args.get('to'), now)
+        start = parse_history_time(request.args.get('from'), end - datetime.timedelta(days=1))
+    except ValueError:
+        return jsonify({"error": "Parameter 'from' und 'to' im ISO-Format (YYYY-MM-DD oder YYYY-MM-DDTHH:MM)"}), 400
+    if end <= start:
+        return jsonify({"error": "'to' muss nach 'from' liegen"}), 400
+    
+    resolution_arg = request.args.get('resolution', 'auto')
+    if resolution_arg == 'auto':
+        resolution = pick_resolution(start, end, LIVEVOL_HISTORY_MAX_POINTS)
+    else:
+        resolution = LIVEVOL_RESOLUTION_ALIASES.get(resolution_arg)
+        if resolution is None and resolution_arg.isdigit() and int(resolution_arg) in LIVEVOL_RESOLUTIONS:
+            resolution = int(resolution_arg)
+        if resolution is None:
+            return jsonify({"error": "resolution: auto, 1m, 15m oder 1h"}), 400
+    
+    points = (end - start).total_seconds() / resolution
+    if points > LIVEVOL_HISTORY_MAX_POINTS:
+        return jsonify({"error": f"Zu viele Punkte ({int(points)}) - gröbere Auflösung oder kürzeren Bereich wählen"}), 400
+    
+    pools = request.args.getlist('pool') or None
+    try:
+        series = livevol_store.history(start, end, resolution, pools)
+    except Exception as e:
+        log.exception("❌ Fehler beim Laden der Live-Vol Historie", error=str(e))
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "resolution": resolution,
+        "series": series
+    })
+
+# ========== END LIVE-VOL HISTORIE ==========
+
+# ========== EXPORT ==========
+# Große Exporte (alle Mitarbeiter-Tage, Pools) zeilenweise aus einem serverseitigen Cursor:
+# konstanter Speicher statt fetchall(), eigene Verbindung statt einer aus dem Pool und
+# begrenzte Parallelität pro Worker, damit Exporte die Live-Endpunkte nicht ausbremsen
+
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", "2000"))
+export_lock = threading.Lock()
+export_counts = {"active": 0, "started": 0, "rejected": 0}
+
+def acquire_export_slot():
+    with export_lock:
+        if export_counts["active"] >= EXPORT_MAX_CONCURRENT:
+            export_counts["rejected"] += 1
+            return False
+        export_counts["active"] += 1
+        export_counts["started"] += 1
+        return True
+
+def release_export_slot():
+    with export_lock:
+        export_counts["active"] -= 1
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def export_value(value):
+    """DB-Wert -> JSON/CSV-tauglicher Wert"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+# Datum/Decimal werden nur bei Bedarf umgewandelt (default), Zahlen und Texte direkt
+export_json = json.JSONEncoder(ensure_ascii=False, default=export_value)
+
+def format_export_chunk(rows, columns, fmt):
+    if fmt == "ndjson":
+        return "".join(export_json.encode(dict(zip(columns, row))) + "\n" for row in rows)
+    buf = StringIO()
+    csv.writer(buf).writerows([map(export_value, row) for row in rows])
+    return buf.getvalue()
+
+def stream_export(dataset, query, params, columns, filename):
+    """
+    Streamt das Ergebnis von query als CSV bzw. NDJSON (?format=, Standard csv)
+    
+    Die Zeilen kommen blockweise (EXPORT_FETCH_ROWS) aus einem benannten Cursor in einer
+    read-only Transaktion; Verbindung und Export-Slot werden beim Schließen der Antwort
+    freigegeben (auch bei abgebrochenem Download).
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "format: csv oder ndjson"}), 400
+    if not DATABASE_URL:
+        return jsonify({"error": "DATABASE_URL nicht konfiguriert"}), 500
+    if not acquire_export_slot():
+        response = jsonify({"error": "Zu viele gleichzeitige Exporte, bitte später erneut versuchen"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    
+    conn = None
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.set_session(readonly=True)
+        cur = conn.cursor(name=f"export_{dataset}")
+        cur.itersize = EXPORT_FETCH_ROWS
+        cur.execute(query, params)
+    except Exception as e:
+        if conn is not None:
+            conn.close()
+        release_export_slot()
+        log.error("❌ Export fehlgeschlagen", dataset=dataset, error=str(e))
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        started = time.perf_counter()
+        rows = 0
+        if fmt == "csv":
+            yield format_export_chunk([columns], columns, fmt)
+        try:
+            while True:
+                chunk = cur.fetchmany(EXPORT_FETCH_ROWS)
+                if not chunk:
+                    break
+                rows += len(chunk)
+                EXPORT_ROWS.inc(dataset, fmt, amount=len(chunk))
+                yield format_export_chunk(chunk, columns, fmt)
+        except Exception as e:
+            log.error("❌ Export abgebrochen", dataset=dataset, rows=rows, error=str(e))
+            raise
+        log.info("📤 Export abgeschlossen", dataset=dataset, format=fmt, rows=rows,
+                 elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+    
+    def close():
+        try:
+            conn.close()  # beendet auch Transaktion und Cursor
+        finally:
+            release_export_slot()
+    
+    response = Response(generate(), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.call_on_close(close)
+    return response
+
+@app.route('/api/export/mitarbeiter', methods=['GET'])
+def export_mitarbeiter():
+    """Alle Mitarbeiter-Tage (?from=YYYY-MM-DD&to=YYYY-MM-DD, beide optional) als CSV/NDJSON"""
+    try:
+        date_from = datetime.date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "Parameter 'from' und 'to' im Format YYYY-MM-DD"}), 400
+    if date_from and date_to and date_to < date_from:
+        return jsonify({"error": "'to' liegt vor 'from'"}), 400
+    
+    # Nur gesetzte Grenzen in die Abfrage (Bereichsscan über mitarbeiter_date_key); als ISO-Text
+    # gebunden wie in /api/mitarbeiter/range, damit auch ältere Tabellen mit date VARCHAR(10)
+    # (RENDER_DEPLOYMENT.md) funktionieren
+    conditions, params = [], []
+    if date_from:
+        conditions.append("date >= %s")
+        params.append(date_from.isoformat())
+    if date_to:
+        conditions.append("date <= %s")
+        params.append(date_to.isoformat())
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    return stream_export(
+        "mitarbeiter",
+        f"SELECT date, frueh, spat, taeti, updated_at FROM mitarbeiter {where} ORDER BY date",
+        params,
+        ["date", "maFrueh", "maSpat", "maTäti", "updatedAt"],
+        f"mitarbeiter_{date_from or 'anfang'}_{date_to or 'ende'}",
+    )
+
+@app.route('/api/export/pools', methods=['GET'])
+def export_pools():
+    """Pool-Konfiguration als CSV/NDJSON (Reihenfolge wie GET /api/pools)"""
+    return stream_export(
+        "pools",
+        "SELECT name, start_time, deadline, factor, rate, use_rotation, updated_at FROM pools ORDER BY id",
+        [],
+        ["name", "start", "deadline", "factor", "rate", "useRotation", "updatedAt"],
+        "pools",
+    )
+
+# ========== END EXPORT ==========
+
+# ========== DASHBOARD ==========
+# Ein Request für den Start des Frontends: Pools, Mitarbeiter und Live-Vol werden parallel
+# geladen, die Antwortzeit ist die der langsamsten Quelle statt der Summe aller Quellen
+
+DASHBOARD_SOURCE_TIMEOUT = float(os.getenv("DASHBOARD_SOURCE_TIMEOUT", "5"))
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "8"))
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+# Felder einer Quelle, wenn sie fehlschlägt oder zu langsam ist
+DASHBOARD_EMPTY = {
+    "pools": {"pools": None, "poolsEtag": None, "poolsSource": None, "poolsSnapshotAge": None},
+    "mitarbeiter": {"mitarbeiter": None},
+    "livevol": {"livevol": None, "livevolAgeSeconds": None, "livevolSource": None},
+}
+
+def dashboard_pools():
+    """Pools wie GET /api/pools (Snapshot bzw. DB, sonst Sheet-Konfiguration oder Standard-Pools)"""
+    try:
+        snapshot = pool_cache.get() if pool_cache else build_pools_snapshot()
+        return {"pools": snapshot.pools, "poolsEtag": snapshot.etag, "poolsSource": "db", "poolsSnapshotAge": None}
+    except Exception as e:
+        log.error("❌ Fehler beim Laden der Pools aus Datenbank", error=str(e))
+        pools, source, age = fallback_pools()
+        return {"pools": pools, "poolsEtag": None, "poolsSource": source, "poolsSnapshotAge": age}
+
+def dashboard_mitarbeiter(date):
+    return {"mitarbeiter": lookup_mitarbeiter(date, roster_timeout=DASHBOARD_SOURCE_TIMEOUT)}
+
+def dashboard_livevol():
+    # Kaltstart: auf den ersten Abruf des Refreshers warten statt selbst zu laden
+    volumes = sheet_refresher.wait("livevol", DASHBOARD_SOURCE_TIMEOUT)
+    if volumes is None:
+        raise RuntimeError("Live-Vol Sheet nicht erreichbar")
+    age = sheet_refresher.age("livevol")
+    return {"livevol": volumes, "livevolAgeSeconds": round(age, 1) if age is not None else None,
+            "livevolSource": sheet_refresher.origin("livevol")}
+
+def timed_source(name, claim, load, *args):
+    """
+    Führt eine Dashboard-Quelle aus: (ergebnis, sekunden)
+    claim: Lock pro Quelle und Request; wer ihn zuerst bekommt (Quelle fertig oder Handler
+    nach dem Timeout), zählt das Ergebnis in dashboard_source_duration_seconds - genau einmal
+    """
+    started = time.perf_counter()
+    try:
+        result = load(*args)
+    except Exception:
+        if claim.acquire(blocking=False):
+            DASHBOARD_SOURCE_SECONDS.observe(time.perf_counter() - started, name, "error")
+        raise
+    seconds = time.perf_counter() - started
+    if claim.acquire(blocking=False):
+        DASHBOARD_SOURCE_SECONDS.observe(seconds, name, "ok")
+    return result, seconds
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    Alles für den Start des Dashboards in einer Antwort (?date=YYYY-MM-DD, Standard: heute)
+    
+    Quellen, die fehlschlagen oder länger als DASHBOARD_SOURCE_TIMEOUT brauchen, sind null
+    und stehen in errors; timings enthält die Dauer pro Quelle in ms.
+    """
+    try:
+        date = datetime.date.fromisoformat(request.args.get('date') or today_string()).isoformat()
+    except ValueError:
+        return jsonify({"error": "Parameter 'date' im Format YYYY-MM-DD"}), 400
+    
+    started = time.perf_counter()
+    sources = {
+        "pools": (dashboard_pools,),
+        "mitarbeiter": (dashboard_mitarbeiter, date),
+        "livevol": (dashboard_livevol,),
+    }
+    claims = {name: threading.Lock() for name in sources}
+    futures = {
+        name: dashboard_executor.submit(timed_source, name, claims[name], *source)
+        for name, source in sources.items()
+    }
+    wait_futures(futures.values(), timeout=DASHBOARD_SOURCE_TIMEOUT)
+    
+    payload = {"date": date, "config": sheets_config()}
+    timings = {}
+    errors = {}
+    for name, future in futures.items():
+        if not future.done() and claims[name].acquire(blocking=False):
+            # Läuft im Hintergrund zu Ende (ohne gezählt zu werden); das Frontend lädt die Quelle selbst nach
+            DASHBOARD_SOURCE_SECONDS.observe(DASHBOARD_SOURCE_TIMEOUT, name, "timeout")
+            timings[name] = round(DASHBOARD_SOURCE_TIMEOUT * 1000, 2)
+            errors[name] = "timeout"
+            payload.update(DASHBOARD_EMPTY[name])
+            continue
+        try:
+            result, seconds = future.result()
+            payload.update(result)
+            timings[name] = round(seconds * 1000, 2)
+        except Exception as e:
+            timings[name] = None
+            errors[name] = str(e)
+            payload.update(DASHBOARD_EMPTY[name])
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if errors:
+        log.warning("⚠️ Dashboard unvollständig", date=date, errors=errors, elapsed_ms=round(elapsed_ms, 1))
+    else:
+        log.info("📊 Dashboard geladen", date=date, elapsed_ms=round(elapsed_ms, 1), sample=True)
+    
+    payload.update({
+        "timings": timings,
+        "errors": errors,
+        "partial": bool(errors),
+        "elapsedMs": round(elapsed_ms, 2)
+    })
+    return jsonify(payload)
+
+# ========== END DASHBOARD ==========
+
 # Pool-Daten werden aus Google Sheets gelesen
 # Änderungen aus dem Web werden ins Google Sheet geschrieben (Web → Google Sheet)
 
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Zeitschritt-Simulation: wann wird jeder Pool bei der aktuellen Besetzung fertig?
+
+needMA/proportionalAssign (allocation.py) rechnen mit einer mittleren Rate über
+start..deadline und drei groben Blöcken. Hier wird der Tag in Slots (z.B. 5 oder
+15 min) zerlegt; in jedem Slot werden die anwesenden Mitarbeiter auf die offenen
+Pools verteilt und deren Restvolumen abgearbeitet:
+
+- FRÜH arbeitet 06:00-15:30, SPÄT 15:30-20:00, Täti wie FRÜH, aber nur in Pools
+  mit useRotation (bzw. useTäti im Frontend)
+- Ein Mitarbeiter schafft rate / factor Volumen pro Stunde
+- Verteilung nach Dringlichkeit: benötigte Köpfe = Restarbeit / Zeit bis zur Deadline
+  (überfällige Pools: Restarbeit / Slot), Largest-Remainder wie proportional_assign;
+  zuerst Täti auf die erlaubten Pools, dann FRÜH/SPÄT auf den Rest
+- Fertige Pools geben ihre Leute ab dem nächsten Slot an die anderen ab
+- Pools werden ab ihrem Start bearbeitet, nach der Deadline weiter bis Schichtende
+
+Ergebnis pro Pool: voraussichtliche Fertigstellung, Puffer zur Deadline, Restvolumen
+an der Deadline und eine Risikostufe (ok / kritisch / engpass wie im Frontend).
+
+Alle Szenarien und Pools werden gemeinsam als Arrays (Szenarien x Pools) gerechnet.
+Für wiederholte Aufrufe (jede Live-Vol Änderung) hält Simulator die statischen Arrays
+pro Pool-Konfiguration und das letzte Ergebnis: unveränderte Eingaben kosten nichts,
+geänderte Volumen nur den Slot-Durchlauf ab "jetzt".
+"""
+import json
+import threading
+
+import numpy as np
+
+from allocation import EARLY_END, proportional_assign, to_hours
+
+DAY_START = 6.0   # Beginn FRÜH
+DAY_END = 20.0    # Ende SPÄT
+SLOT_MINUTES = (5, 10, 15, 30, 60)
+
+_EPS = 1e-9
+
+
+def format_time(hours):
+    """7.25 -> '07:15' (None bleibt None)"""
+    if hours is None:
+        return None
+    minutes = int(round(hours * 60))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def risk_status(slack_minutes):
+    """ok: vor der Deadline fertig, kritisch: nach der Deadline, engpass: nicht bis Schichtende"""
+    if slack_minutes is None:
+        return "engpass"
+    return "ok" if slack_minutes >= 0 else "kritisch"
+
+
+def slot_grid(slot_minutes):
+    """Slot-Grenzen des Tages in Stunden; Schichtwechsel 15:30 ist immer eine Grenze"""
+    step = slot_minutes / 60
+    grid = set(np.round(np.arange(DAY_START, DAY_END + _EPS, step), 9).tolist())
+    grid.update((EARLY_END, DAY_END))
+    return np.array(sorted(t for t in grid if t <= DAY_END))
+
+
+def _pool_key(pool):
+    return (pool.get('name'), pool.get('start'), pool.get('deadline'), pool.get('factor'),
+            pool.get('rate'), bool(pool.get('useTäti', pool.get('useRotation', False))))
+
+
+class PoolTimeline:
+    """Statische Pool-Daten als Arrays (unabhängig von Volumen und Besetzung)"""
+
+    def __init__(self, pools):
+        self.pools = pools
+        self.names = [p.get('name') for p in pools]
+        self.start = np.array([to_hours(p.get('start')) for p in pools], dtype=float)
+        self.deadline = np.array([to_hours(p.get('deadline')) or DAY_END for p in pools], dtype=float)
+        self.deadline_labels = [format_time(d) for d in self.deadline.tolist()]
+        rate = np.array([float(p.get('rate') or 80) for p in pools], dtype=float)
+        self.rate = np.where(rate > 0, rate, 80.0)
+        self.factor = np.array([float(1 if p.get('factor') is None else p.get('factor')) for p in pools],
+                               dtype=float)
+        self.use_taeti = np.array([bool(p.get('useTäti', p.get('useRotation', False))) for p in pools],
+                                  dtype=bool)
+        # Personenstunden pro Volumeneinheit (factor / rate)
+        self.hours_per_unit = self.factor / self.rate
+        self.taeti_group = np.where(self.use_taeti, 0, -1)
+        self.all_group = np.zeros(len(pools), dtype=np.int64)
+        self._grids = {}
+
+    def __len__(self):
+        return len(self.pools)
+
+    def slots(self, slot_minutes, now):
+        """Slot-Startzeiten und -längen ab now (erster Slot ggf. verkürzt bis zur nächsten Grenze)"""
+        grid = self._grids.get(slot_minutes)
+        if grid is None:
+            grid = self._grids[slot_minutes] = slot_grid(slot_minutes)
+        bounds = np.concatenate(([now], grid[grid > now + _EPS]))
+        return bounds[:-1], np.diff(bounds)
+
+
+def simulate(pools, volumes, scenarios, now, slot_minutes=15):
+    """
+    Simuliert den Rest des Tages ab now (Stunden, z.B. 9.5) für alle Szenarien.
+
+    pools: Liste wie GET /api/pools oder PoolTimeline
+    volumes: {Poolname: Restvolumen} (fehlende Pools: liveVol des Pools)
+    scenarios: [{"maFrueh": 20, "maSpat": 10, "maTäti": 4, "volumes": {...}}, ...]
+    """
+    timeline = pools if isinstance(pools, PoolTimeline) else PoolTimeline(pools)
+    S, P = len(scenarios), len(timeline)
+    index = {name: i for i, name in enumerate(timeline.names)}
+
+    base = np.array([float(volumes.get(name, p.get('liveVol') or 0) or 0)
+                     for name, p in zip(timeline.names, timeline.pools)], dtype=float)
+    volume = np.tile(np.maximum(base, 0.0), (S, 1))
+    frueh = np.zeros(S)
+    spaet = np.zeros(S)
+    taeti = np.zeros(S)
+    for s, sc in enumerate(scenarios):
+        for name, v in (sc.get('volumes') or {}).items():
+            i = index.get(name)
+            if i is not None:
+                volume[s, i] = max(float(v), 0.0)
+        frueh[s] = float(sc.get('maFrueh') or 0)
+        spaet[s] = float(sc.get('maSpat') or 0)
+        taeti[s] = float(sc.get('maTäti') or 0)
+
+    # Arbeit in Personenstunden
+    remaining = volume * timeline.hours_per_unit
+    finished_at = np.where(remaining <= _EPS, np.maximum(now, timeline.start), np.nan)
+    # Restarbeit an der Deadline (bereits vergangene Deadlines: alles, was jetzt noch offen ist)
+    at_deadline = np.where(timeline.deadline <= now, remaining, np.nan)
+    heads_sum = np.zeros((S, P))
+    heads_hours = np.zeros((S, P))
+
+    starts, lengths = timeline.slots(slot_minutes, now)
+    for t, dt in zip(starts, lengths):
+        active = (remaining > _EPS) & (timeline.start <= t + _EPS)
+        if not active.any():
+            if not (remaining > _EPS).any():
+                break
+            continue
+
+        early = DAY_START <= t < EARLY_END
+        late = EARLY_END <= t < DAY_END
+        regular = frueh * early + spaet * late
+        taeti_on = taeti * early
+
+        hours_left = np.maximum(timeline.deadline - t, dt)
+        need = np.where(active, np.ceil(remaining / hours_left - _EPS), 0.0)
+        need = np.where(active, np.maximum(need, 1.0), 0.0)
+
+        # Täti nur in erlaubten Pools, danach FRÜH/SPÄT auf den restlichen Bedarf
+        taeti_need = np.where(timeline.use_taeti, need, 0.0)
+        assigned = proportional_assign(taeti_need, timeline.taeti_group, taeti_on[:, None])
+        rest = np.maximum(need - assigned, 0.0)
+        # Kein Restbedarf mehr: übrige Leute gleichmäßig auf die offenen Pools
+        idle = rest.sum(axis=1) == 0
+        rest[idle] = active[idle]
+        assigned += proportional_assign(rest, timeline.all_group, regular[:, None])
+
+        capacity = assigned * dt
+        done = active & (capacity >= remaining - _EPS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            finish = t + remaining / assigned
+            # Deadline innerhalb dieses Slots: Restarbeit dort interpolieren
+            crossing = (timeline.deadline > t) & (timeline.deadline <= t + dt + _EPS)
+            left = np.maximum(remaining - assigned * (timeline.deadline - t), 0.0)
+        at_deadline = np.where(crossing & np.isnan(at_deadline), left, at_deadline)
+        finished_at = np.where(done & np.isnan(finished_at), finish, finished_at)
+        heads_sum += assigned * dt
+        heads_hours += active * dt
+        remaining = np.maximum(remaining - capacity, 0.0)
+
+    # Deadline nach Schichtende (oder Schleife früh beendet): Stand am Ende
+    at_deadline = np.where(np.isnan(at_deadline), remaining, at_deadline)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        units_per_hour = np.where(timeline.hours_per_unit > 0, 1 / timeline.hours_per_unit, 0.0)
+        left_volume = at_deadline * units_per_hour
+        risk = np.where(volume > 0, np.minimum(left_volume / volume, 1.0), 0.0)
+        heads = np.where(heads_hours > 0, heads_sum / heads_hours, 0.0)
+
+    # Ausgabe: erst als Listen aus numpy holen (statt Element für Element)
+    unfinished = np.isnan(finished_at)
+    slack = np.where(unfinished, 0, np.round((timeline.deadline - np.nan_to_num(finished_at)) * 60))
+    completion_minutes = np.where(unfinished, 0, np.round(np.nan_to_num(finished_at) * 60))
+    left_units = np.ceil(left_volume - _EPS)
+
+    results = []
+    for s in range(S):
+        rows = zip(timeline.names, timeline.deadline_labels, volume[s].astype(int).tolist(),
+                   unfinished[s].tolist(), completion_minutes[s].astype(int).tolist(),
+                   slack[s].astype(int).tolist(), left_units[s].astype(int).tolist(),
+                   np.round(risk[s], 3).tolist(), np.round(heads[s], 1).tolist())
+        pools_out = []
+        for name, deadline, vol, is_open, minutes, slack_min, left, pool_risk, avg_heads in rows:
+            slack_min = None if is_open else slack_min
+            pools_out.append({
+                "name": name,
+                "deadline": deadline,
+                "volume": vol,
+                "completion": None if is_open else f"{minutes // 60:02d}:{minutes % 60:02d}",
+                "slackMinutes": slack_min,
+                "remainingAtDeadline": left,
+                "risk": pool_risk,
+                "avgHeads": avg_heads,
+                "status": risk_status(slack_min),
+            })
+        completions = [p["completion"] for p in pools_out if p["completion"]]
+        results.append({
+            "totals": {
+                "pools": P,
+                "late": sum(p["status"] == "kritisch" for p in pools_out),
+                "unfinished": sum(p["status"] == "engpass" for p in pools_out),
+                "lastCompletion": max(completions) if P and len(completions) == P else None,
+            },
+            "pools": pools_out,
+        })
+    return results
+
+
+class Simulator:
+    """
+    Wiederholte Simulation (z.B. bei jeder Live-Vol Änderung):
+    - PoolTimeline (statische Arrays, Slot-Raster) pro Pool-Konfiguration
+    - letztes Ergebnis pro Eingabe (Pools, Volumen, Besetzung, Minute, Slotlänge)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timeline_key = None
+        self._timeline = None
+        self._last_key = None
+        self._last_result = None
+
+        self.runs = 0
+        self.cached = 0
+
+    def timeline(self, pools):
+        key = tuple(_pool_key(p) for p in pools)
+        with self._lock:
+            if key != self._timeline_key:
+                self._timeline = PoolTimeline(pools)
+                self._timeline_key = key
+            return self._timeline, key
+
+    def run(self, pools, volumes, scenarios, now, slot_minutes=15):
+        # Auf die Minute genau: mehrere Aufrufe innerhalb einer Minute teilen sich das Ergebnis
+        now = int(now * 60) / 60
+        timeline, pools_key = self.timeline(pools)
+        key = (pools_key, json.dumps([volumes, scenarios], sort_keys=True, default=str), now, slot_minutes)
+        with self._lock:
+            if key == self._last_key:
+                self.cached += 1
+                return self._last_result
+        result = simulate(timeline, volumes or {}, scenarios, now, slot_minutes)
+        with self._lock:
+            self._last_key = key
+            self._last_result = result
+            self.runs += 1
+        return result
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "cached": self.cached,
+            "pools": len(self._timeline) if self._timeline is not None else 0,
+        }
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Letzter erfolgreich geladener Stand der Sheets (und der Pools aus der DB) auf der Platte.
+
+Damit starten neue Worker und frische Deploys nicht leer, und bei Ausfällen von
+Google bzw. der Datenbank werden echte (ältere) Daten statt Standard-Pools oder
+0/0/0 geliefert; das Alter des Snapshots geht mit in die Antwort.
+
+Format pro Datei (<name>.snap), little-endian:
+    Header  <4sHHdII  magic "EPSN", version, kind, fetched_at (Unix-Zeit), länge, crc32
+    Payload zlib-komprimiert
+        kind 1: JSON (Live-Vol, Pool-Konfiguration, Pools)
+        kind 2: Dienstplan-Index, 8 Byte pro Datum (<BBHHH: tag, monat, früh, spät, täti)
+
+- Schreiben: temporäre Datei + os.replace (atomar, Leser sehen nie halbe Dateien);
+  unveränderte Daten werden höchstens alle resave_after Sekunden neu geschrieben
+- Lesen: mmap, Ergebnis pro Prozess gecacht, solange sich Inode/mtime/Größe nicht ändern;
+  alle Worker teilen sich dieselben Dateien (Page Cache)
+"""
+import errno
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from applog import get_logger
+from roster import RosterIndex
+
+log = get_logger(__name__)
+
+MAGIC = b"EPSN"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdII")
+ROSTER_ENTRY = struct.Struct("<BBHHH")
+
+KIND_JSON = 1
+KIND_ROSTER = 2
+
+
+def encode_value(value):
+    """Wert -> (kind, payload)"""
+    if isinstance(value, RosterIndex):
+        raw = b"".join(ROSTER_ENTRY.pack(day, month, *counts)
+                       for (day, month), counts in sorted(value.counts.items()))
+        return KIND_ROSTER, zlib.compress(raw, 6)
+    # default=str wie Flasks JSON (Decimal aus NUMERIC-Spalten)
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return KIND_JSON, zlib.compress(raw, 6)
+
+
+def decode_value(kind, payload):
+    raw = zlib.decompress(payload)
+    if kind == KIND_ROSTER:
+        counts = {(day, month): (frueh, spat, taeti)
+                  for day, month, frueh, spat, taeti in ROSTER_ENTRY.iter_unpack(raw)}
+        return RosterIndex(counts)
+    if kind == KIND_JSON:
+        return json.loads(raw)
+    raise ValueError(f"Unbekannter Snapshot-Typ {kind}")
+
+
+class SnapshotStore:
+    def __init__(self, directory, resave_after=60.0, max_age=None):
+        self.directory = directory
+        self.resave_after = resave_after
+        self.max_age = max_age          # ältere Snapshots werden nicht mehr geliefert
+        self._lock = threading.Lock()
+        self._saved = {}                # name -> (crc32, gespeichert_um) dieses Prozesses
+        self._cache = {}                # name -> ((ino, mtime_ns, size), (wert, fetched_at))
+        self._disabled = False
+
+        self.writes = 0
+        self.skipped = 0
+        self.reads = 0
+        self.cache_hits = 0
+        self.errors = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.snap")
+
+    # ---------- Schreiben ----------
+
+    def save(self, name, value, fetched_at=None):
+        """Speichert value als Snapshot; True, wenn geschrieben wurde"""
+        if self._disabled or value is None:
+            return False
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        kind, payload = encode_value(value)
+        crc = zlib.crc32(payload)
+
+        with self._lock:
+            saved = self._saved.get(name)
+            if saved and saved[0] == crc and fetched_at - saved[1] < self.resave_after:
+                self.skipped += 1
+                return False
+            self._saved[name] = (crc, fetched_at)
+
+        path = self.path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, kind, fetched_at, len(payload), crc))
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except OSError as e:
+            self.errors += 1
+            with self._lock:
+                self._saved.pop(name, None)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            if isinstance(e, PermissionError) or e.errno == errno.EROFS:
+                self._disabled = True
+                log.warning("⚠️ Snapshot-Verzeichnis nicht beschreibbar, Snapshots deaktiviert",
+                            directory=self.directory, error=str(e))
+            else:
+                log.warning("⚠️ Snapshot konnte nicht geschrieben werden", name=name, error=str(e))
+            return False
+        self.writes += 1
+        return True
+
+    # ---------- Lesen ----------
+
+    def load(self, name):
+        """(wert, fetched_at) des letzten Snapshots oder None (fehlt, kaputt oder zu alt)"""
+        path = self.path(name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        file_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._cache.get(name)
+        if cached is not None and cached[0] == file_key:
+            self.cache_hits += 1
+            entry = cached[1]
+        else:
+            entry = self._read(path, name)
+            if entry is None:
+                return None
+            with self._lock:
+                self._cache[name] = (file_key, entry)
+
+        if self.max_age is not None and time.time() - entry[1] > self.max_age:
+            return None
+        return entry
+
+    def _read(self, path, name):
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if len(mm) < HEADER.size:
+                        raise ValueError("Datei zu kurz")
+                    magic, version, kind, fetched_at, length, crc = HEADER.unpack_from(mm, 0)
+                    if magic != MAGIC or version != VERSION:
+                        raise ValueError("Unbekanntes Format")
+                    payload = mm[HEADER.size:HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                raise ValueError("Prüfsumme falsch")
+            value = decode_value(kind, payload)
+        except (OSError, ValueError, zlib.error) as e:
+            self.errors += 1
+            log.warning("⚠️ Snapshot nicht lesbar", name=name, error=str(e))
+            return None
+        self.reads += 1
+        return value, fetched_at
+
+    def age(self, name):
+        """Sekunden seit dem Abruf der Daten im Snapshot (oder None)"""
+        entry = self.load(name)
+        return time.time() - entry[1] if entry else None
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "enabled": not self._disabled,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "reads": self.reads,
+            "cacheHits": self.cache_hits,
+            "errors": self.errors,
+        }
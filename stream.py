@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Server-Sent-Events Hub: EIN Hintergrund-Poller pro Prozess statt Polling pro Browser-Tab.
+
+- Jede Quelle (Live-Vol, Pools, Mitarbeiter) wird in ihrem eigenen Intervall gelesen
+- Nur geänderte Werte werden als Event an alle Abonnenten verteilt
+- Heartbeat-Kommentare halten die Verbindung offen
+- Reconnect mit Last-Event-ID: verpasste Events werden aus einem Ringpuffer
+  nachgeliefert, sonst gibt es einen vollständigen Snapshot
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from applog import get_logger
+
+log = get_logger(__name__)
+
+
+def diff_values(old, new):
+    """Änderungen zwischen zwei Werten; None wenn unverändert"""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {k: v for k, v in new.items() if old.get(k) != v or k not in old}
+        removed = [k for k in old if k not in new]
+        return {"changes": changes, "removed": removed}
+    return {"value": new}
+
+
+def format_event(event_id, name, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+
+
+class StreamHub:
+    def __init__(self, heartbeat=15.0, backlog=500, idle_stop=60.0, retry_ms=3000):
+        self.heartbeat = heartbeat
+        self.backlog = backlog
+        self.idle_stop = idle_stop
+        self.retry_ms = retry_ms
+        self._sources = {}   # name -> (loader, interval)
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._epoch = uuid.uuid4().hex[:8]   # Event-IDs sind nur innerhalb eines Prozesses gültig
+        self._seq = 0
+        self._events = deque(maxlen=self.backlog)   # (seq, name, data_json)
+        self._state = {}
+        self._subscribers = 0
+        self._last_subscriber_at = time.monotonic()
+        self._threads = {}   # Quelle -> Poller-Thread
+
+    def _check_fork(self):
+        """Nach fork(): eigener Zustand und eigener Poller pro Worker (Lock muss gehalten werden)"""
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def add_source(self, name, loader, interval):
+        """loader() liefert einen JSON-serialisierbaren Wert (None = aktuell nicht verfügbar)"""
+        self._sources[name] = (loader, interval)
+
+    def ensure_running(self):
+        """Startet die Poller (ein Thread pro Quelle, einmal pro Prozess, auch nach fork())"""
+        with self._cond:
+            self._check_fork()
+            self._last_subscriber_at = time.monotonic()
+            for name, (loader, interval) in self._sources.items():
+                thread = self._threads.get(name)
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(
+                        target=self._run, args=(name, loader, interval),
+                        name=f"stream-poller-{name}", daemon=True
+                    )
+                    self._threads[name] = thread
+                    thread.start()
+
+    def _run(self, name, loader, interval):
+        """Liest eine Quelle im eigenen Takt - eine langsame Quelle bremst die anderen nicht"""
+        while True:
+            with self._cond:
+                idle = self._subscribers == 0 and time.monotonic() - self._last_subscriber_at > self.idle_stop
+                if idle or self._threads.get(name) is not threading.current_thread():
+                    # Keine Abonnenten mehr: Poller beenden, kein unnötiger Upstream-Traffic
+                    if self._threads.get(name) is threading.current_thread():
+                        del self._threads[name]
+                    return
+
+            started = time.monotonic()
+            try:
+                value = loader()
+            except Exception as e:
+                log.warning("⚠️ Stream-Quelle fehlgeschlagen", source=name, error=str(e))
+                value = None
+            if value is not None:
+                self.publish(name, value)
+
+            time.sleep(max(0.05, interval - (time.monotonic() - started)))
+
+    def publish(self, name, value):
+        """Übernimmt einen neuen Wert und verteilt nur die Änderungen"""
+        with self._cond:
+            change = diff_values(self._state.get(name), value)
+            if change is None:
+                return
+            self._state[name] = value
+            self._seq += 1
+            self._events.append((self._seq, name, json.dumps(change, ensure_ascii=False, default=str)))
+            self._cond.notify_all()
+
+    def _event_id(self, seq):
+        return f"{self._epoch}-{seq}"
+
+    def _snapshot(self):
+        return format_event(
+            self._event_id(self._seq),
+            "snapshot",
+            json.dumps(self._state, ensure_ascii=False, default=str),
+        )
+
+    def _resume_seq(self, last_event_id):
+        """Sequenznummer zum Fortsetzen, oder None wenn ein Snapshot nötig ist"""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if seq > self._seq or seq < oldest - 1:
+            return None
+        return seq
+
+    def subscribe(self, last_event_id=None):
+        """Generator mit SSE-Text für einen Client"""
+        with self._cond:
+            self._check_fork()
+            self._subscribers += 1
+        self.ensure_running()
+        with self._cond:
+            last_seq = self._resume_seq(last_event_id)
+            first = [f"retry: {self.retry_ms}\n\n"]
+            if last_seq is None:
+                first.append(self._snapshot())
+                last_seq = self._seq
+
+        try:
+            for chunk in first:
+                yield chunk
+
+            while True:
+                with self._cond:
+                    if self._seq == last_seq:
+                        self._cond.wait(self.heartbeat)
+                    if self._seq == last_seq:
+                        pending = None
+                    elif self._events and self._events[0][0] > last_seq + 1:
+                        # Zu weit zurück (Ringpuffer übergelaufen): kompletter Snapshot
+                        pending = [self._snapshot()]
+                        last_seq = self._seq
+                    else:
+                        pending = [
+                            format_event(self._event_id(seq), name, data)
+                            for seq, name, data in self._events if seq > last_seq
+                        ]
+                        last_seq = self._seq
+
+                if pending is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield "".join(pending)
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                self._last_subscriber_at = time.monotonic()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self._subscribers,
+                "lastEventId": self._event_id(self._seq),
+                "bufferedEvents": len(self._events),
+                "pollers": sorted(name for name, t in self._threads.items() if t.is_alive()),
+                "sources": sorted(self._sources),
+            }
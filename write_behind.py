@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Write-Behind-Puffer für häufige kleine Schreibzugriffe (POST /api/mitarbeiter/save).
+
+- Änderungen werden pro Schlüssel (Datum) zusammengefasst: der neueste Zeitstempel
+  gewinnt, ältere Werte werden verworfen, bevor sie die Datenbank erreichen
+- Ein Hintergrund-Thread pro Prozess schreibt alle offenen Werte in EINER Transaktion,
+  spätestens nach interval Sekunden oder sobald max_pending Schlüssel offen sind
+- Jeder Schreibzugriff bekommt eine Sequenznummer; durable_seq ist die höchste Nummer,
+  bis zu der alles gespeichert (oder durch einen neueren Wert ersetzt) ist
+- wait_durable(seq) schreibt sofort und wartet (synchrone Variante für read-your-writes)
+- Bei Fehlern bleiben die Werte im Puffer und werden erneut versucht; scheitert ein Batch an
+  einem dauerhaften Fehler (permanent_errors, z.B. ungültiger Wert), wird zeilenweise
+  geschrieben und nur die abgelehnten Zeilen werden verworfen (rejected(seq))
+- Beim Beenden des Prozesses wird der Rest geschrieben (atexit)
+
+Sequenznummern gelten pro Prozess (pro gunicorn-Worker).
+"""
+import atexit
+import os
+import threading
+import time
+
+from applog import get_logger
+
+log = get_logger(__name__)
+
+
+class WriteBehindQueue:
+    def __init__(self, flush, interval=0.5, max_pending=200, max_backoff=30.0, permanent_errors=()):
+        # flush([(key, value, ts), ...]) schreibt alle Einträge in einer Transaktion
+        # permanent_errors: Exception-Typen, bei denen eine Wiederholung nichts ändert
+        self._flush = flush
+        self.permanent_errors = tuple(permanent_errors)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._pending = {}        # key -> (value, ts, seq)
+        self._inflight = {}       # key -> (value, ts, seq), gerade in einer Transaktion
+        self._seq = 0
+        self._durable_seq = 0
+        self._failed_seq = 0      # höchste Sequenznummer eines fehlgeschlagenen Versuchs
+        self._rejected = {}       # seq -> Fehler, dauerhaft abgelehnte (verworfene) Werte
+        self._urgent = False
+        self._thread = None
+        self._pid = None
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.rejected_rows = 0
+        self.last_error = None
+
+    # ---------- Schreiben ----------
+
+    def submit(self, key, value, ts=None):
+        """Puffert einen Wert; liefert seine Sequenznummer"""
+        self.ensure_running()
+        ts = time.time() if ts is None else ts
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self.submitted += 1
+            current = self._pending.get(key)
+            if current is not None:
+                self.coalesced += 1
+            if current is None or ts >= current[1]:
+                self._pending[key] = (value, ts, seq)
+            if len(self._pending) >= self.max_pending:
+                self._urgent = True
+                self._cond.notify_all()
+            return seq
+
+    def wait_durable(self, seq, timeout):
+        """
+        Schreibt sofort und wartet, bis seq gespeichert ist; False bei Fehler oder Timeout.
+        Abgelehnte Werte (rejected(seq)) sind verworfen, bei allen anderen Fehlern bleibt
+        der Wert im Puffer und wird weiter versucht.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._urgent = True
+            self._cond.notify_all()
+            while self._durable_seq < seq:
+                if self._failed_seq >= seq or seq in self._rejected:
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return seq not in self._rejected
+
+    def pending(self, key):
+        """Noch nicht gespeicherter Wert für key (oder None) - für read-your-writes"""
+        with self._cond:
+            entry = self._pending.get(key) or self._inflight.get(key)
+            return entry[0] if entry else None
+
+    def rejected(self, seq):
+        """Fehlermeldung, wenn der Wert mit dieser Sequenznummer verworfen wurde, sonst None"""
+        with self._cond:
+            return self._rejected.get(seq)
+
+    @property
+    def seq(self):
+        return self._seq
+
+    @property
+    def durable_seq(self):
+        return self._durable_seq
+
+    # ---------- Hintergrund-Thread ----------
+
+    def ensure_running(self):
+        """Startet den Flush-Thread (einmal pro Prozess, auch nach fork())"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # Puffer des Elternprozesses gehört nicht diesem Worker
+                self._pid = os.getpid()
+                self._thread = None
+                self._pending = {}
+                self._inflight = {}
+                atexit.register(self.close)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        backoff = self.interval
+        while True:
+            with self._cond:
+                if not self._urgent:
+                    self._cond.wait(backoff if self.failures and self._pending else self.interval)
+                self._urgent = False
+            if self.flush_now():
+                backoff = self.interval
+            else:
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+
+    def flush_now(self):
+        """Schreibt alle offenen Werte in einer Transaktion; True bei Erfolg (oder nichts zu tun)"""
+        with self._cond:
+            if not self._pending:
+                return True
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+            upto = self._seq
+        entries = [(key, value, ts) for key, (value, ts, _) in sorted(batch.items())]
+        rejected = {}
+        try:
+            try:
+                self._flush(entries)
+            except self.permanent_errors as e:
+                if len(entries) == 1:
+                    rejected[entries[0][0]] = (batch[entries[0][0]][2], str(e))
+                else:
+                    # Ein ungültiger Wert soll nicht alle anderen blockieren: einzeln schreiben
+                    log.warning("⚠️ Write-Behind: Batch abgelehnt, schreibe zeilenweise",
+                                rows=len(entries), error=str(e))
+                    for index, entry in enumerate(entries):
+                        try:
+                            self._flush([entry])
+                        except self.permanent_errors as row_error:
+                            rejected[entry[0]] = (batch[entry[0]][2], str(row_error))
+                        except Exception:
+                            # Vorübergehender Fehler: Geschriebenes und Abgelehntes nicht wiederholen
+                            done = {key for key, _, _ in entries[:index]}
+                            batch = {key: entry for key, entry in batch.items() if key not in done}
+                            self._reject(rejected)
+                            with self._cond:
+                                self.rows_written += len(done) - len(rejected)
+                            raise
+        except Exception as e:
+            with self._cond:
+                # Zurück in den Puffer, neuere Werte aus der Zwischenzeit haben Vorrang
+                for key, entry in batch.items():
+                    current = self._pending.get(key)
+                    if current is None or entry[1] > current[1]:
+                        self._pending[key] = entry
+                self._inflight = {}
+                self._failed_seq = upto
+                self.failures += 1
+                self.last_error = str(e)
+                self._cond.notify_all()
+            log.warning("⚠️ Write-Behind: Schreiben fehlgeschlagen, wird wiederholt",
+                        rows=len(batch), error=str(e))
+            return False
+        for key, (_, error) in rejected.items():
+            log.error("❌ Write-Behind: Wert abgelehnt und verworfen", key=key, value=batch[key][0], error=error)
+        self._reject(rejected)
+        with self._cond:
+            self._inflight = {}
+            # Alles bis upto ist gespeichert, abgelehnt oder durch einen neueren (noch offenen) Wert ersetzt
+            self._durable_seq = max(self._durable_seq, upto)
+            self.flushes += 1
+            self.rows_written += len(entries) - len(rejected)
+            self.last_error = None
+            self._cond.notify_all()
+        log.debug("💾 Write-Behind geschrieben", rows=len(entries) - len(rejected), durable_seq=upto)
+        return True
+
+    def _reject(self, rejected):
+        """Merkt abgelehnte Werte {key: (seq, fehler)} für rejected(seq); die letzten 1000 reichen"""
+        if not rejected:
+            return
+        with self._cond:
+            for seq, error in rejected.values():
+                self._rejected[seq] = error
+            while len(self._rejected) > 1000:
+                del self._rejected[next(iter(self._rejected))]
+            self.rejected_rows += len(rejected)
+            self._cond.notify_all()
+
+    def close(self):
+        """Schreibt den Rest (beim Beenden des Prozesses)"""
+        if self._pid == os.getpid() and self._pending:
+            if not self.flush_now():
+                log.error("❌ Write-Behind: offene Werte beim Beenden nicht gespeichert",
+                          rows=len(self._pending))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "seq": self._seq,
+                "durableSeq": self._durable_seq,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "rowsWritten": self.rows_written,
+                "failures": self.failures,
+                "rejected": self.rejected_rows,
+                "lastError": self.last_error,
+            }